@@ -0,0 +1,67 @@
+from fastapi import HTTPException
+
+from app.consts import limit_min, BATCH_MAX_ITEMS
+from app.validations import clean_text, validate_min_length, validate_not_empty
+
+# =================================================================
+# --- PREDICCIÓN POR LOTES ---
+# =================================================================
+
+def validate_batch_size(items):
+    """Verifica que el lote no esté vacío ni supere BATCH_MAX_ITEMS"""
+    if not items:
+        raise HTTPException(status_code=422, detail="El lote debe tener al menos un texto.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"El lote puede tener máximo {BATCH_MAX_ITEMS} textos.")
+
+def prepare_batch(items, min_length=limit_min):
+    """
+    Limpia y valida cada texto del lote y agrupa los duplicados.
+    returns: (results, unique_texts, groups)
+        results: un dict por item con su id (y error si no pasó la validación)
+        unique_texts: textos válidos distintos, en orden de aparición
+        groups: posiciones en items de cada texto de unique_texts
+    """
+    results = [{"id": item.id} for item in items]
+    positions = {}
+    for pos, item in enumerate(items):
+        text = clean_text(item.content)
+        try:
+            validate_not_empty(text)
+            validate_min_length(text, min_length)
+        except HTTPException as e:
+            results[pos]["error"] = e.detail
+            continue
+        positions.setdefault(text, []).append(pos)
+    return results, list(positions), list(positions.values())
+
+def run_batch(unique_texts, groups, results, predict_fn):
+    """
+    Ejecuta predict_fn(list_text) -> lista de dicts (uno por texto) sobre todo el lote.
+    Si el lote falla, se reintenta texto por texto para que el error quede solo en
+    los textos que lo producen. Cada resultado se copia a todas sus posiciones.
+    """
+    if unique_texts:
+        try:
+            outputs = predict_fn(unique_texts)
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"[DIAGNÓSTICO WARN] Falló el lote de {len(unique_texts)} textos ({e}), se procesa uno por uno")
+            outputs = []
+            for text in unique_texts:
+                try:
+                    outputs.append(predict_fn([text])[0])
+                except Exception as e_item:
+                    outputs.append({"error": str(e_item)})
+
+        for output, positions in zip(outputs, groups):
+            for pos in positions:
+                results[pos].update(output)
+
+    return {
+        "total": len(results),
+        "unique": len(unique_texts),
+        "errors": sum(1 for result in results if result.get("error")),
+        "results": results
+    }
@@ -0,0 +1,128 @@
+"""
+    Benchmark del modo multi-worker (app/gunicorn_conf.py): memoria y throughput
+    según el número de workers.
+
+        python -m app.benchmark_workers --workers 1 2 4 --requests 400 --concurrency 16
+
+    Para cada cantidad de workers levanta gunicorn, espera /health/ready, lanza
+    peticiones concurrentes a /predict/ods/ y mide RSS y PSS (memoria proporcional:
+    las páginas compartidas por copy-on-write se reparten entre los procesos) del
+    maestro y los workers. Si la memoria se comparte, el PSS total crece mucho menos
+    que workers * RSS de un proceso.
+"""
+import subprocess
+import argparse
+import asyncio
+import time
+import json
+import os
+
+import httpx
+
+SAMPLE_TEXTS = [
+    "Sistema de monitoreo de la calidad del agua en comunidades rurales con sensores de bajo costo.",
+    "A machine learning model to predict crop yield from satellite images and weather data.",
+    "Plataforma educativa para la enseñanza de matemáticas a niños con discapacidad visual.",
+    "Renewable energy microgrid for isolated villages with battery storage and demand forecasting.",
+]
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(c) for c in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+def _memory_kb(pid):
+    """(RSS, PSS) en kB de un proceso, desde /proc/<pid>/smaps_rollup"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:"):
+                    values[parts[0][:-1]] = int(parts[1])
+    except FileNotFoundError:
+        pass
+    return values.get("Rss", 0), values.get("Pss", 0)
+
+def memory_report(master_pid):
+    pids = [master_pid] + _children(master_pid)
+    procesos = {pid: _memory_kb(pid) for pid in pids}
+    return {
+        "processes": len(pids),
+        "rss_mb_total": round(sum(rss for rss, _ in procesos.values()) / 1024, 1),
+        "pss_mb_total": round(sum(pss for _, pss in procesos.values()) / 1024, 1),
+        "rss_mb_per_process": {pid: round(rss / 1024, 1) for pid, (rss, _) in procesos.items()},
+    }
+
+
+async def _load(url, n_requests, concurrency):
+    latencias = []
+    errores = 0
+    semaforo = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        async def una(i):
+            nonlocal errores
+            async with semaforo:
+                t0 = time.perf_counter()
+                response = await client.post(url, json={"model_name": "default", "content": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]})
+                latencias.append((time.perf_counter() - t0) * 1000)
+                if response.status_code != 200:
+                    errores += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una(i) for i in range(n_requests)))
+        total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requests": n_requests,
+        "errors": errores,
+        "throughput_rps": round(n_requests / total, 2),
+        "latency_ms_p50": round(latencias[len(latencias) // 2], 1),
+        "latency_ms_p95": round(latencias[int(len(latencias) * 0.95) - 1], 1),
+    }
+
+def _wait_ready(base_url, proc, timeout):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn terminó antes de estar listo")
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(2)
+    raise TimeoutError(f"{base_url} no estuvo listo en {timeout}s")
+
+def benchmark_workers(workers_list, n_requests=400, concurrency=16, port=8090, ready_timeout=900):
+    resultados = {}
+    base_url = f"http://127.0.0.1:{port}"
+    for workers in workers_list:
+        env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(port)}
+        proc = subprocess.Popen(["gunicorn", "app.main:app", "-c", "app/gunicorn_conf.py"], env=env)
+        try:
+            _wait_ready(base_url, proc, ready_timeout)
+            idle = memory_report(proc.pid)
+            carga = asyncio.run(_load(f"{base_url}/predict/ods/", n_requests, concurrency))
+            resultados[workers] = {"memory_idle": idle, "memory_after_load": memory_report(proc.pid), **carga}
+            print(f"   {workers} workers: {json.dumps(resultados[workers])}")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=120)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memoria y throughput del modo multi-worker")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    print(json.dumps(benchmark_workers(args.workers, args.requests, args.concurrency, args.port), indent=2))
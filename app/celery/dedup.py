@@ -0,0 +1,53 @@
+from celery.result import AsyncResult
+import redis
+import uuid
+
+from ..consts import REDIS_HOST, REDIS_PORT, REDIS_STORE_DB_INDEX, TASK_DEDUP_TTL
+
+# =================================================================
+# --- ENVÍOS DUPLICADOS DE TAREAS ---
+# =================================================================
+# La clave del payload apunta al task_id que lo está procesando (o ya lo procesó).
+# Un envío idéntico dentro de TASK_DEDUP_TTL recibe ese mismo task_id en lugar de
+# encolar otra tarea; si la tarea anterior falló, se encola una nueva.
+
+_redis_client = None
+
+def _client():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_STORE_DB_INDEX, decode_responses=True)
+    return _redis_client
+
+def delay_once(task, key, *args, ttl=TASK_DEDUP_TTL):
+    """
+    Encola task(*args) salvo que ya exista una tarea con la misma clave.
+    returns: (task_id, created)
+    """
+    dedup_key = f"tarea:{key}"
+    task_id = str(uuid.uuid4())
+    client = None
+    try:
+        client = _client()
+        if not client.set(dedup_key, task_id, nx=True, ex=ttl):
+            existing = client.get(dedup_key)
+            if existing and AsyncResult(existing, app=task.app).state not in ("FAILURE", "REVOKED"):
+                return existing, False
+            client.set(dedup_key, task_id, ex=ttl)
+    except redis.RedisError as e:
+        # Sin Redis no hay deduplicación, pero la tarea se encola igual
+        print(f"[DIAGNÓSTICO WARN] Deduplicación de tareas no disponible: {e}")
+
+    try:
+        task.apply_async(args=args, task_id=task_id)
+    except Exception:
+        # La tarea no se encoló: se libera la clave para que los envíos idénticos
+        # no reciban un task_id que nunca se va a ejecutar
+        if client is not None:
+            try:
+                if client.get(dedup_key) == task_id:
+                    client.delete(dedup_key)
+            except redis.RedisError as e:
+                print(f"[DIAGNÓSTICO WARN] No se pudo liberar la clave {dedup_key}: {e}")
+        raise
+    return task_id, True
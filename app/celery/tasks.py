@@ -96,3 +96,55 @@ def run_analisis_sentimiento_task(self, texto: str):
         print(f"Worker: Error en la tarea {task_id}: {e}")
         # Re-lanza la excepción para que Celery marque la tarea como fallida
         raise e
+
+
+@celery_app.task(bind=True)
+def run_bulk_chunk_task(self, job_id: str, tipo: str, model_name: str, chunk_index: int):
+    """
+    Clasifica un chunk de un archivo masivo con la predicción por lotes del tipo
+    y publica el progreso del trabajo en 'task_results' (task_id = job_id).
+    """
+    from app.projects.bulk.logic import get_bulk_predictor, read_chunk, read_chunk_ids, write_chunk_results, mark_chunk_done, mark_chunk_failed
+
+    print(f"Worker: Chunk {chunk_index} del trabajo {job_id} ({tipo}, {model_name})")
+    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_STORE_DB_INDEX)
+
+    items = None
+    try:
+        items = read_chunk(job_id, chunk_index)
+        loader, predict_batch = get_bulk_predictor(tipo)
+        result = predict_batch(loader, model_name, items)
+        results = result["results"]
+    except Exception as e:
+        # El chunk completo queda con error, el resto del trabajo sigue
+        print(f"Worker: Error en el chunk {chunk_index} del trabajo {job_id}: {e}")
+        error = getattr(e, "detail", None) or str(e)
+        try:
+            ids = [item.id for item in items] if items is not None else read_chunk_ids(job_id, chunk_index)
+        except Exception:
+            ids = []
+        results = [{"id": row_id, "error": error} for row_id in ids]
+
+    # El chunk se cuenta siempre para que el trabajo no quede en "Processing"; si no se
+    # pudieron escribir sus resultados queda como fallido y el trabajo termina en FAILURE
+    try:
+        write_chunk_results(job_id, chunk_index, results)
+    except Exception as e:
+        print(f"[DIAGNÓSTICO ERROR] Worker: no se pudieron escribir los resultados del chunk {chunk_index} del trabajo {job_id}: {e}")
+        state = mark_chunk_failed(job_id, chunk_index, len(results))
+    else:
+        state = mark_chunk_done(job_id, chunk_index, len(results), sum(1 for r in results if r.get("error")))
+
+    payload = {
+        "task_id": job_id,
+        "status": state["status"],
+        "progress": {k: state[k] for k in ("done_chunks", "failed_chunks", "total_chunks", "done_rows", "total_rows", "errors")}
+    }
+    if state["status"] in (stages[1], stages[2]):
+        payload["result"] = {"download": f"/predict/bulk/{job_id}/result"}
+    try:
+        redis_client.publish("task_results", json.dumps(payload))
+    except Exception as pub_e:
+        print(f"[DIAGNÓSTICO ERROR] Worker: FALLÓ al publicar el progreso del trabajo {job_id}. Error: {pub_e}")
+
+    return payload["progress"]
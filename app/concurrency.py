@@ -0,0 +1,175 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from fastapi import HTTPException
+import threading
+import asyncio
+import json
+import time
+
+from app.consts import INFERENCE_MAX_CONCURRENCY, INFERENCE_MAX_QUEUE, INFERENCE_RETRY_AFTER, INFERENCE_MAX_FORWARDS
+from app.metrics import Histogram
+from app.models.cache import hash_texto
+
+# =================================================================
+# --- UTILIDADES DE CONCURRENCIA ---
+# =================================================================
+
+class SingleFlight:
+    """
+    Ejecuta una función una sola vez por clave aunque varios hilos la pidan a la vez.
+    El primer hilo ejecuta la función; los demás esperan y reciben el mismo
+    resultado, o la misma excepción si falla.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._calls[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self):
+        """Claves que se están ejecutando en este momento"""
+        with self._lock:
+            return list(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Versión para el event loop de SingleFlight: las corrutinas que piden la misma
+    clave mientras otra la está calculando esperan ese mismo resultado.
+    do() devuelve (resultado, compartido) donde compartido indica si se reutilizó
+    una ejecución en curso.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: si esta petición se cancela, la ejecución compartida sigue
+            return await asyncio.shield(future), True
+
+        future = asyncio.ensure_future(fn(*args, **kwargs))
+        self._calls[key] = future
+        try:
+            return await asyncio.shield(future), False
+        finally:
+            if future.done():
+                self._calls.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._calls.pop(key, None))
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+class OverloadedError(Exception):
+    """El ejecutor no admite más trabajo (hilos ocupados y cola llena)"""
+
+
+class BoundedExecutor:
+    """
+    Pool de hilos con concurrencia fija y una cola de espera acotada.
+    Se admiten como máximo max_workers + max_queue tareas a la vez; las demás se
+    rechazan de inmediato con OverloadedError en lugar de acumularse.
+    run() se llama desde el event loop y espera el resultado sin bloquearlo.
+    """
+
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._admitted = 0 # solo se modifica desde el event loop
+        self.rejected = 0
+        self.queue_wait_ms = Histogram([1, 5, 10, 50, 100, 250, 500, 1000, 5000])
+
+    async def run(self, fn, *args, **kwargs):
+        if self._admitted >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(f"Ejecutor {self.name} saturado")
+
+        enqueued_at = time.perf_counter()
+        def task():
+            self.queue_wait_ms.observe((time.perf_counter() - enqueued_at) * 1000)
+            return fn(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        self._admitted += 1
+        future = self._pool.submit(task)
+        # El lugar se libera cuando termina el hilo y no cuando deja de esperarlo la
+        # corrutina: si la petición se cancela, la tarea sigue ocupando el ejecutor
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            pass # el event loop ya se cerró (apagado)
+
+    def _decrement(self):
+        self._admitted -= 1
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "active": min(self._admitted, self.max_workers),
+            "queued": max(0, self._admitted - self.max_workers),
+            "rejected": self.rejected,
+            "queue_wait_ms": self.queue_wait_ms.stats()
+        }
+
+
+# Ejecutor compartido por los endpoints de clasificación (ods, patente, carrera)
+inference_executor = BoundedExecutor("inference", INFERENCE_MAX_CONCURRENCY, INFERENCE_MAX_QUEUE)
+
+# Solo el forward de los modelos se limita a INFERENCE_MAX_FORWARDS; los hilos del
+# ejecutor que esperan al micro-batcher no ocupan un lugar
+forward_slots = threading.BoundedSemaphore(INFERENCE_MAX_FORWARDS)
+
+def service_overloaded():
+    """Respuesta 503 con Retry-After para cuando la inferencia no da abasto"""
+    return HTTPException(
+        status_code=503,
+        detail="Servicio saturado, intente nuevamente en unos segundos.",
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER)}
+    )
+
+async def run_inference(fn, *args, **kwargs):
+    """Ejecuta fn en el ejecutor de inferencia; si está saturado responde 503 con Retry-After"""
+    try:
+        return await inference_executor.run(fn, *args, **kwargs)
+    except OverloadedError:
+        raise service_overloaded()
+
+
+def request_key(endpoint, model_name, *payload):
+    """Clave de coalescencia: endpoint, modelo y hash del payload (normalizado por quien llama)"""
+    return f"{endpoint}:{model_name}:{hash_texto(json.dumps(payload, ensure_ascii=False))}"
+
+# Evaluaciones con LLM síncronas idénticas y concurrentes comparten una sola llamada
+llm_flight = SingleFlight()
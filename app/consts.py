@@ -1,3 +1,5 @@
+import os
+
 # OpenRouter
 models_openRouter = {
     "gpt_model": "openai/gpt-oss-20b:free",
@@ -11,6 +13,113 @@ models_openRouter = {
 
 limit_min = 50
 
+# --- Configuración de preprocesamiento (spaCy) ---
+# Tamaño de lote y número de procesos para nlp.pipe
+SPACY_BATCH_SIZE = 64
+SPACY_N_PROCESS = 1
+# Componentes que la lematización no necesita (el lematizador solo usa tagger y attribute_ruler)
+SPACY_DISABLE = ["parser", "ner"]
+# Número máximo de textos lematizados que se guardan en memoria
+CORPUS_CACHE_MAXSIZE = 4096
+
+# --- Configuración de traducción (MarianMT) ---
+# Textos por llamada a generate
+TRANSLATION_BATCH_SIZE = 16
+# Cache de traducciones: LRU en memoria delante de Redis (REDIS_STORE_DB_INDEX)
+TRANSLATION_CACHE_MAXSIZE = 2048
+TRANSLATION_CACHE_TTL = 604800 # 7 días
+TRANSLATION_CACHE_REDIS = True
+
+# --- Detección de idioma ---
+# El nivel léxico decide si tiene al menos MIN_VOTES indicios y MIN_RATIO de ellos a favor de un idioma
+LANG_LEXICAL_MIN_VOTES = 5
+LANG_LEXICAL_MIN_RATIO = 0.85
+# Tokens del prefijo que recibe XLM-R en los casos ambiguos
+LANG_DETECTOR_MAX_LENGTH = 128
+# Textos etiquetados (es/en) con los que se mide el nivel léxico en el calentamiento
+LANG_VALIDATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "lang_validation.jsonl")
+
+# --- Presupuesto de modelos en memoria (por cada ModelLoader) ---
+# Al superarlo se libera el modelo usado hace más tiempo; los modelos por defecto
+# de cada router están fijados y no cuentan como candidatos. None = sin límite.
+MODEL_CACHE_MAX_MODELS = 3
+MODEL_CACHE_MAX_BYTES = 2 * 1024 ** 3 # 2 GB
+# Segundos máximos que se espera a las peticiones en curso antes de liberar un modelo reemplazado
+MODEL_DRAIN_TIMEOUT = 300
+# Cargar con mmap los artefactos convertidos (*.mmap.joblib, model.safetensors), ver app/models/mmap_artifacts.py
+MODEL_MMAP = True
+
+# --- Calentamiento al iniciar ---
+# Pasa textos sintéticos por cada modelo cargado antes de reportar /health/ready
+WARMUP_ENABLED = True
+# Veces que se repite cada etapa (la primera paga las asignaciones perezosas)
+WARMUP_REPEATS = 2
+
+# --- Micro-batching de modelos transformer ---
+# Las peticiones concurrentes de pocos textos se juntan en un forward de hasta
+# MAX_BATCH_SIZE textos, esperando como máximo MAX_WAIT_MS por el lote.
+MICROBATCH_ENABLED = True
+MICROBATCH_MAX_BATCH_SIZE = 16
+MICROBATCH_MAX_WAIT_MS = 10
+# Segundos que una petición espera su resultado del micro-batcher antes de fallar
+MICROBATCH_RESULT_TIMEOUT = 120
+
+# --- Ejecutor de inferencia de los endpoints de clasificación ---
+# Hilos dedicados a las peticiones de clasificación (separados del pool por defecto de
+# Starlette). Cada petición ocupa un hilo mientras espera al micro-batcher, así que con
+# menos hilos que MICROBATCH_MAX_BATCH_SIZE los lotes nunca se llenan: por defecto son iguales.
+INFERENCE_MAX_CONCURRENCY = MICROBATCH_MAX_BATCH_SIZE if MICROBATCH_ENABLED else 2
+# Forwards de modelos (torch/ONNX/sklearn/Marian) a la vez en el proceso, incluido el del
+# micro-batcher; es lo que realmente limita el uso de CPU/GPU
+INFERENCE_MAX_FORWARDS = 2
+# Peticiones que pueden esperar un hilo libre; al llenarse se responde 503 con Retry-After
+INFERENCE_MAX_QUEUE = 32
+INFERENCE_RETRY_AFTER = 2 # segundos
+
+# --- Cache de resultados de predicción (ods, patente, carrera) ---
+PREDICTION_CACHE_MAXSIZE = 4096
+PREDICTION_CACHE_TTL = 86400 # 1 día
+PREDICTION_CACHE_REDIS = True
+
+# --- Endpoints /batch ---
+BATCH_MAX_ITEMS = 1000
+
+# --- Clasificación de archivos masivos (/predict/bulk, tareas de Celery) ---
+# Directorio compartido entre la API y los workers (volumen en docker-compose)
+BULK_JOBS_DIR = os.getenv("BULK_JOBS_DIR", "/code/data/bulk")
+# Filas por tarea de Celery
+BULK_CHUNK_SIZE = 500
+# Segundos que se guarda el estado del trabajo en Redis
+BULK_JOB_TTL = 604800 # 7 días
+
+# --- Lotes de los modelos transformer ---
+# Tokens (textos x longitud con padding) que puede tener un lote en predict_transformer
+TRANSFORMER_MAX_TOKENS_PER_BATCH = 8192
+
+# --- Backend de inferencia de los modelos transformer ---
+# "torch" u "onnx". ONNX Runtime requiere exportar antes el modelo con
+# python -m app.models.onnx_backend export <tipo> <model_folder>; si no hay
+# un model.onnx verificado se usa torch.
+TRANSFORMER_BACKEND_DEFAULT = "torch"
+# Backend por modelo (model_folder -> backend)
+TRANSFORMER_BACKENDS = {}
+# Hilos de ONNX Runtime por sesión (0 = los que decida onnxruntime)
+ONNX_INTRA_OP_THREADS = 0
+
+# --- Precisión de los modelos de torch ---
+# "fp32" o "int8" (cuantización dinámica). El artefacto int8 se genera con
+# python -m app.models.quantization classifier|translator ...; si no existe se usa fp32.
+TRANSFORMER_PRECISION_DEFAULT = "fp32"
+# Precisión por modelo clasificador (model_folder -> precisión)
+TRANSFORMER_PRECISION = {}
+# Precisión de los traductores MarianMT
+TRANSLATION_PRECISION = "fp32"
+
+# --- Modelos compartidos (spaCy, detección de idioma y traducción) ---
+# Se cargan de forma perezosa; estos se precargan en el lifespan de la API.
+# Una lista vacía deja todo en carga bajo demanda.
+SHARED_MODELS_PRELOAD = ["nlp", "detector", "es_en", "en_es"]
+
 # --- Configuración RABBIT MQ ---
 RABBITMQ_HOST="rabbitmq"
 RABBITMQ_USERNAME="guest"
@@ -25,6 +134,8 @@ REDIS_HOST="redis"
 REDIS_PORT=6379
 REDIS_CELERY_DB_INDEX=10
 REDIS_STORE_DB_INDEX=0
+# Segundos que los caches esperan para reintentar Redis después de un error
+CACHE_REDIS_RETRY_SECONDS = 30
 
 # El backend de resultados usa RPC, que también funciona sobre RabbitMQ.
 # Para producción a gran escala, se suele preferir Redis.
@@ -34,6 +145,9 @@ result_backend = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_CELERY_DB_INDEX}"
 # Se establece el tiempo en segundos. 7 días = 7 * 24 * 60 * 60 = 604800 segundos.
 result_expires = 604800
 
+# Segundos durante los que un envío idéntico a una tarea de Celery reutiliza su task_id
+TASK_DEDUP_TTL = 3600
+
 stages = ["Processing", "SUCCESS", "FAILURE", "confirmed", "shipped", "in transit", "arrived", "delivered"]
 
 # tags auto-generado llamado "default"
@@ -62,6 +176,18 @@ tags_metadata = [
         "name": "Análisis de Sentimiento",
         "description": "Clasificación de sentimientos (positivo, negativo, neutro).",
     },
+    {
+        "name": "Fusión",
+        "description": "ODS, patente y carrera sobre el mismo texto compartiendo el preprocesamiento.",
+    },
+    {
+        "name": "Archivos masivos",
+        "description": "Clasificación de archivos CSV/JSONL en segundo plano con Celery.",
+    },
+    {
+        "name": "Modelos",
+        "description": "Índice y administración de los modelos de clasificación.",
+    },
     {
         "name": "Default",
         "description": "Endpoints básicos de la API (root, status, etc.)",
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal
 
 """
     Clases para objeto de entrada y salida de las aplicaciones de FastAPI
@@ -68,6 +68,60 @@ class PredictionResponseCareer(BaseModel):
     top3_careers: list[str] | None = None
     top3_probabilities: list[float] | None = None
 
+"""
+    Clases para las predicciones por lote (/batch)
+    id: identificador del texto definido por el cliente, se devuelve en el resultado
+    error: motivo por el que no se pudo clasificar ese texto (el resto del lote sí se procesa)
+"""
+class BatchItem(BaseModel):
+    id: str
+    content: str | None = None
+
+class BatchRequest(BaseModel):
+    model_name: str = "default"
+    items: list[BatchItem]
+
+class BatchResultBase(BaseModel):
+    id: str
+    error: str | None = None
+
+class BatchResult(BatchResultBase):
+    prediction: int | None = None
+    probability: float | None = None
+    probabilities: list[float] | None = None
+
+class BatchResultODS(BatchResultBase):
+    prediction: int | None = None
+    probability: float | None = None
+    predictions: list[int] | None = None
+    probabilities: list[float] | None = None
+
+class BatchResultCareer(BatchResultBase):
+    prediction: str | None = None
+    probability: float | None = None
+    top3_careers: list[str] | None = None
+    top3_probabilities: list[float] | None = None
+
+"""
+    model_name: modelo usado (alias ya resuelto)
+    total: textos recibidos
+    unique: textos distintos que se procesaron (los duplicados se clasifican una sola vez)
+    errors: textos con error
+    results: un resultado por texto, en el mismo orden de items
+"""
+class BatchResponse(BaseModel):
+    model_name: str
+    total: int
+    unique: int
+    errors: int
+    results: list[BatchResult]
+
+class BatchResponseODS(BatchResponse):
+    results: list[BatchResultODS]
+
+class BatchResponseCareer(BatchResponse):
+    results: list[BatchResultCareer]
+
 """
     approved: booleano de si o no está aprobado
     verbs: lista de los verbos mal utilizado
@@ -138,3 +192,40 @@ class TaskStatusResponse(BaseModel):
     task_id: str
     status: str
     result: Any | None = None
+
+
+# --- MODELOS PARA ADMINISTRACIÓN DE MODELOS ---
+class ModelSwapRequest(BaseModel):
+    """Petición para cambiar en caliente el modelo al que apunta un alias."""
+    model_name: str
+    alias: str = "default"
+
+
+# --- MODELOS PARA ARCHIVOS MASIVOS ---
+class BulkJobResponse(BaseModel):
+    """Estado de un trabajo de clasificación de un archivo masivo (job_id sirve como task_id en el WebSocket)."""
+    job_id: str
+    tipo: str
+    model_name: str
+    status: str
+    total_rows: int
+    total_chunks: int
+    done_chunks: int
+    failed_chunks: int = 0
+    done_rows: int
+    errors: int
+
+
+# --- MODELOS PARA EL ENDPOINT DE FUSIÓN ---
+class FusionRequest(BaseModel):
+    """Un texto clasificado por varias tareas con un solo preprocesamiento."""
+    content: str | None = None
+    tasks: list[Literal["ods", "patente", "carrera"]] = ["ods", "patente", "carrera"]
+    models: dict[str, str] = {} # tarea -> model_name (por defecto "default")
+
+class FusionResponse(BaseModel):
+    """Resultado de cada tarea pedida; errors tiene el motivo de las tareas que fallaron."""
+    ods: PredictionResponseODS | None = None
+    patente: PredictionResponse | None = None
+    carrera: PredictionResponseCareer | None = None
+    errors: dict[str, str] = {}
@@ -0,0 +1,58 @@
+"""
+    Modo multi-worker con gunicorn y precarga (pre-fork):
+        gunicorn app.main:app -c app/gunicorn_conf.py
+
+    El proceso maestro importa la aplicación (modelos de los routers) y carga los
+    modelos compartidos (spaCy, XLM-R, MarianMT) antes de crear los workers. Los
+    workers comparten esas páginas de memoria por copy-on-write mientras nadie las
+    escriba; para eso:
+      - gc.freeze() mueve todos los objetos cargados a la generación permanente,
+        así el recolector de basura de cada worker no toca sus cabeceras.
+      - En el maestro no se ejecuta ninguna inferencia: torch crearía su pool de
+        hilos antes del fork y los hilos no sobreviven al fork. El calentamiento
+        lo hace cada worker en su lifespan.
+      - Cada worker usa WORKER_TORCH_THREADS hilos de torch para no competir por
+        los núcleos con los demás workers.
+    Los alias de modelos (/models/{tipo}/swap) son por worker: el cambio se publica
+    en Redis (canal model_swaps) para que todos los workers lo repitan.
+
+    Variables de entorno: WEB_CONCURRENCY (workers), PORT, WORKER_TORCH_THREADS.
+"""
+import multiprocessing
+import gc
+import os
+
+# Los tokenizers rápidos crean hilos propios; después del fork se bloquean
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# Cargar los modelos en el maestro puede tardar varios minutos
+timeout = 300
+graceful_timeout = 60
+accesslog = "-"
+
+# Hilos de torch por worker (por defecto, los núcleos repartidos entre los workers)
+torch_threads = int(os.getenv("WORKER_TORCH_THREADS", "0")) or max(1, multiprocessing.cpu_count() // workers)
+
+
+def when_ready(server):
+    """Maestro, después de importar la app y antes de crear los workers"""
+    from app.consts import SHARED_MODELS_PRELOAD
+    from app.models.ModelLoader import preload_shared_models, loaded_shared_models
+
+    preload_shared_models(SHARED_MODELS_PRELOAD)
+    server.log.info(f"Modelos compartidos cargados en el maestro: {loaded_shared_models()}")
+
+    # Congelar todo lo cargado hasta ahora para que el GC de los workers no lo escriba
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"gc.freeze: {gc.get_freeze_count()} objetos compartidos entre workers")
+
+def post_fork(server, worker):
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    server.log.info(f"Worker {worker.pid} iniciado con {torch_threads} hilos de torch")
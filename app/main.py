@@ -1,24 +1,36 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from typing import Dict
 import asyncio
 import json
-from .consts import tags_metadata, REDIS_HOST, REDIS_PORT # , REDIS_STORE_DB_INDEX
+from .consts import tags_metadata, REDIS_HOST, REDIS_PORT, SHARED_MODELS_PRELOAD, WARMUP_ENABLED # , REDIS_STORE_DB_INDEX
 
 # --- Projects ---
-from .projects.ods.router import ods_router
-from .projects.patente.router import patente_router
-from .projects.carrera.router import carrera_router
+from .projects.ods.router import ods_router, loader_ods
+from .projects.patente.router import patente_router, loader_patente
+from .projects.carrera.router import carrera_router, loader_carrera
 from .projects.objetivos.router import objetivo_router
 from .projects.analisis_sentimiento.router import router_sentimiento
 from .projects.objetivos_gen_spec.router import objetivo_gen_spe_router
+from .projects.modelos.router import modelos_router
+from .projects.modelos.logic import SWAP_CHANNEL, apply_remote_message
+from .projects.bulk.router import bulk_router
+from .projects.fusion.router import fusion_router
+from .projects.ods.logic import ods_pipeline
+from .projects.patente.logic import patente_pipeline
+from .projects.carrera.logic import carrera_pipeline
 
 # --- Imports de Celery y Redis ---
 from .redis import ConnectionManager
 import redis.asyncio as redis # Versión asíncrona para FastAPI
 
 from .entities import TaskStatusResponse 
+from .models.ModelLoader import corpus_cache, translation_cache, language_detection_stats, preload_shared_models, loaded_shared_models
+from .warmup import warmup_models, warmup_state
+from .concurrency import inference_executor
+from .prediction_cache import prediction_cache, prediction_flight
 
 # --- Importaciones de Celery tasks ---
 from .celery.tasks import celery_app
@@ -39,6 +51,10 @@ async def redis_listener(pubsub):
             if message["type"] == "message":
                 # Ahora el mensaje es un JSON puro, lo decodificamos directamente.
                 data = json.loads(message["data"])
+                if message["channel"] == SWAP_CHANNEL:
+                    # Cambio de alias o recarga del índice hecha en otro worker
+                    apply_remote_message(data)
+                    continue
                 task_id = data.get("task_id")
                 print(f"[DIAGNÓSTICO] Mensaje recibido de Redis para la tarea: {task_id}")
 
@@ -63,17 +79,35 @@ async def redis_listener(pubsub):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("[DIAGNÓSTICO] Iniciando lifespan de la aplicación...")
+    # Precarga de los modelos compartidos (fuera del event loop)
+    await asyncio.to_thread(preload_shared_models, SHARED_MODELS_PRELOAD)
+    print(f"[DIAGNÓSTICO] Modelos compartidos cargados: {loaded_shared_models()}")
+
+    # Calentamiento en segundo plano: /health/ready responde 503 hasta que termine
+    warmup_task = None
+    if WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(asyncio.to_thread(warmup_models))
+    else:
+        warmup_state["ready"] = True
+
     # Usamos las constantes para la conexión
     # si no se especifica un número de base de dato, por defecto es 0 (db=REDIS_STORE_DB_INDEX)
     redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
     pubsub = redis_client.pubsub()
-    await pubsub.subscribe("task_results")
+    await pubsub.subscribe("task_results", SWAP_CHANNEL)
     listener_task = asyncio.create_task(redis_listener(pubsub))
     print("[DIAGNÓSTICO] Tarea de listener de Redis creada.")
     
     yield
     
     print("[DIAGNÓSTICO] Apagando lifespan de la aplicación...")
+    if warmup_task is not None and not warmup_task.done():
+        # El hilo del calentamiento no se puede interrumpir; se deja de esperarlo
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except asyncio.CancelledError:
+            print("[DIAGNÓSTICO] Calentamiento cancelado.")
     listener_task.cancel()
     await pubsub.close()
     await redis_client.close()
@@ -106,6 +140,42 @@ app.add_middleware(
 def read_root():
     return {"Hello": "IA", "status": "ok"}
 
+# El proceso responde (liveness)
+@app.get("/health/live", tags=["Default"], status_code=200)
+def health_live():
+    return {"status": "ok"}
+
+# Listo para recibir tráfico: modelos precargados y calentados (readiness)
+@app.get("/health/ready", tags=["Default"], status_code=200)
+def health_ready():
+    if not warmup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming", "stages": warmup_state["stages"]})
+    return {"status": "ready", "stages": warmup_state["stages"], "errors": warmup_state["errors"]}
+
+# Métricas de los caches y modelos
+@app.get("/stats", tags=["Default"], status_code=200)
+def read_stats():
+    return {
+        "preprocesamiento": corpus_cache.stats(),
+        "traduccion": translation_cache.stats(),
+        "predicciones": prediction_cache.stats(),
+        "coalescencia": prediction_flight.stats(),
+        "deteccion_idioma": language_detection_stats,
+        "modelos_compartidos": loaded_shared_models(),
+        "calentamiento": warmup_state,
+        "inferencia": inference_executor.stats(),
+        "modelos": {
+            "ods": loader_ods.stats(),
+            "patente": loader_patente.stats(),
+            "carrera": loader_carrera.stats(),
+        },
+        "pipelines": {
+            "ods": ods_pipeline.stats(),
+            "patente": patente_pipeline.stats(),
+            "carrera": carrera_pipeline.stats(),
+        },
+    }
+
 # Patente
 app.include_router(patente_router, prefix="/predict/patente", tags=["Patente"])
 
@@ -124,6 +194,15 @@ app.include_router(objetivo_gen_spe_router, prefix="/predict/objetivos", tags=["
 # Analisis de sentimiento
 app.include_router(router_sentimiento, prefix="/predict/sentimiento", tags=["Análisis de Sentimiento"])
 
+# ODS, patente y carrera con un solo preprocesamiento
+app.include_router(fusion_router, prefix="/predict/fusion", tags=["Fusión"])
+
+# Clasificación de archivos masivos (Celery)
+app.include_router(bulk_router, prefix="/predict/bulk", tags=["Archivos masivos"])
+
+# Índice de modelos
+app.include_router(modelos_router, prefix="/models", tags=["Modelos"])
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await manager.connect(websocket, client_id)
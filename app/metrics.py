@@ -0,0 +1,35 @@
+import threading
+
+# =================================================================
+# --- MÉTRICAS EN MEMORIA ---
+# =================================================================
+
+class Histogram:
+    """
+    Histograma de cubetas fijas (acumulativas, al estilo Prometheus).
+    buckets: límites superiores de cada cubeta, en orden creciente
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * len(self.buckets)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for i, limit in enumerate(self.buckets):
+                if value <= limit:
+                    self._counts[i] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buckets": {f"<={limit}": count for limit, count in zip(self.buckets, self._counts)},
+                "count": self.count,
+                "sum": round(self.sum, 3),
+                "mean": round(self.sum / self.count, 3) if self.count else 0.0
+            }
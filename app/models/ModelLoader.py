@@ -3,37 +3,123 @@ from transformers import (
     MarianMTModel, MarianTokenizer
 )
 
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 from nltk.corpus import stopwords
+import numpy as np
 import joblib
 import string
+import json
 import torch
+import threading
 import spacy
+import time
 import os
 import re
 
-nlp = spacy.load("en_core_web_lg")
+from app.consts import (
+    SPACY_BATCH_SIZE, SPACY_N_PROCESS, SPACY_DISABLE, CORPUS_CACHE_MAXSIZE, TRANSLATION_BATCH_SIZE,
+    TRANSLATION_CACHE_MAXSIZE, TRANSLATION_CACHE_TTL, TRANSLATION_CACHE_REDIS,
+    LANG_LEXICAL_MIN_VOTES, LANG_LEXICAL_MIN_RATIO, LANG_DETECTOR_MAX_LENGTH, LANG_VALIDATION_PATH,
+    MODEL_CACHE_MAX_MODELS, MODEL_CACHE_MAX_BYTES,
+    MICROBATCH_ENABLED, MICROBATCH_MAX_BATCH_SIZE, MICROBATCH_MAX_WAIT_MS, MICROBATCH_RESULT_TIMEOUT,
+    TRANSFORMER_MAX_TOKENS_PER_BATCH, TRANSFORMER_BACKEND_DEFAULT, TRANSFORMER_BACKENDS,
+    TRANSFORMER_PRECISION_DEFAULT, TRANSFORMER_PRECISION, TRANSLATION_PRECISION,
+    MODEL_DRAIN_TIMEOUT, MODEL_MMAP
+)
+from app.models.cache import LRUCache, TieredCache, ModelCache, hash_texto
+from app.models.microbatch import MicroBatcher, BatcherClosedError
+from app.models.onnx_backend import OnnxClassifier, onnx_path, onnx_ready
+from app.models.quantization import load_quantized, quantized_path, translation_dir
+from app.models.registry import ModelIndex
+from app.models.mmap_artifacts import load_joblib, load_classifier_mmap, safetensors_path
+from app.concurrency import SingleFlight, forward_slots, service_overloaded
 
 stopwords_es = set(stopwords.words('spanish'))
 stopwords_en = set(stopwords.words('english'))
 stop_words = stopwords_es | stopwords_en
 
+# Modelo de spaCy para la lematización
+nlp_model_name = "en_core_web_lg"
+
 # Detección de idioma
 model_ckpt = "papluca/xlm-roberta-base-language-detection"
-tokenizer_detected = AutoTokenizer.from_pretrained(model_ckpt)
-model_detected = AutoModelForSequenceClassification.from_pretrained(model_ckpt)
 
 # Traducción de español a inglés
 model_name_es_en = "Helsinki-NLP/opus-mt-es-en"
-tokenizer_tradu_es_en = MarianTokenizer.from_pretrained(model_name_es_en)
-model_tradu_es_en = MarianMTModel.from_pretrained(model_name_es_en)
 
 # Traduccion de inglés a español
 model_name_en_es = "Helsinki-NLP/opus-mt-en-es"
-tokenizer_tradu_en_es = MarianTokenizer.from_pretrained(model_name_en_es)
-model_tradu_en_es = MarianMTModel.from_pretrained(model_name_en_es)
 
-# Función de limpieza y lematización
-def procesar_texto(texto):
+# =================================================================
+# --- REGISTRO PEREZOSO DE MODELOS COMPARTIDOS ---
+# =================================================================
+# Cada modelo se carga en su primer uso y no al importar el módulo, así los procesos
+# que solo necesitan una parte (p. ej. sin traducción) no pagan el resto.
+
+def _load_nlp():
+    return spacy.load(nlp_model_name)
+
+def _load_detector():
+    return AutoTokenizer.from_pretrained(model_ckpt), AutoModelForSequenceClassification.from_pretrained(model_ckpt)
+
+def _load_translator(direccion):
+    checkpoint = translation_checkpoints[direccion]
+    tokenizer = MarianTokenizer.from_pretrained(checkpoint)
+    if TRANSLATION_PRECISION == "int8":
+        model_dir = translation_dir(direccion)
+        if os.path.exists(quantized_path(model_dir)):
+            return tokenizer, load_quantized(model_dir, checkpoint, MarianMTModel)
+        print(f"   ⚠️ No existe el traductor int8 de {direccion}, se usa fp32")
+    return tokenizer, MarianMTModel.from_pretrained(checkpoint)
+
+# Checkpoint de cada dirección de traducción
+translation_checkpoints = {
+    "es_en": model_name_es_en,
+    "en_es": model_name_en_es,
+}
+
+shared_model_loaders = {
+    "nlp": _load_nlp,
+    "detector": _load_detector,
+    "es_en": lambda: _load_translator("es_en"),
+    "en_es": lambda: _load_translator("en_es"),
+}
+
+_shared_models = {}
+_shared_flight = SingleFlight()
+
+def _load_shared_model(name):
+    # Otro hilo pudo terminar la carga justo antes de entrar aquí
+    if name in _shared_models:
+        return _shared_models[name]
+
+    print(f"📥 Cargando modelo compartido: {name}")
+    inicio = time.perf_counter()
+    model = shared_model_loaders[name]()
+    _shared_models[name] = model
+    print(f"   ✅ Modelo compartido {name} cargado en {time.perf_counter() - inicio:.2f}s")
+    return model
+
+def get_shared_model(name):
+    """Devuelve un modelo compartido, cargándolo una sola vez aunque lo pidan varios hilos"""
+    model = _shared_models.get(name)
+    if model is not None:
+        return model
+    if name not in shared_model_loaders:
+        raise KeyError(f"Modelo compartido desconocido: {name}")
+    return _shared_flight.do(name, _load_shared_model, name)
+
+def preload_shared_models(names=None):
+    """Hook de precarga para el lifespan de FastAPI (por defecto carga todos)"""
+    for name in names if names is not None else shared_model_loaders:
+        get_shared_model(name)
+
+def loaded_shared_models():
+    return list(_shared_models)
+
+# Limpieza previa a spaCy
+def normalizar_texto(texto):
     if texto is None or texto.strip() == "":
         return ""
 
@@ -49,129 +135,402 @@ def procesar_texto(texto):
     # Replace multiple spaces with a single space
     texto = re.sub(r'\s+', ' ', texto)
 
-    # Procesar con spaCy
-    doc = nlp(texto)
+    return texto
 
-    # Lematizar y quitar stopwords
+# Lematizar y quitar stopwords de un documento de spaCy
+def lematizar_doc(doc):
     tokens = [token.lemma_ for token in doc if token.lemma_ not in stop_words and not token.is_punct and not token.is_space]
 
     return " ".join(tokens)
 
+# Memo de textos ya normalizados y lematizados (clave: hash del texto normalizado)
+corpus_cache = LRUCache(maxsize=CORPUS_CACHE_MAXSIZE)
+
+# Función de limpieza y lematización por lotes
+def procesar_textos(textos, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS, usar_cache=True):
+    """
+    Limpia y lematiza una lista de textos con nlp.pipe.
+    El costo del pipeline se paga una vez por lote y no por documento.
+    Los resultados se guardan en corpus_cache.
+    usar_cache: False para textos que no son tráfico real (calentamiento, validación)
+    """
+    normalizados = [normalizar_texto(texto) for texto in textos]
+    resultados = [""] * len(normalizados)
+
+    # Buscar en el memo, agrupando los textos repetidos del lote
+    pendientes = {}
+    for i, texto in enumerate(normalizados):
+        if not texto:
+            continue
+        key = hash_texto(texto)
+        cached = corpus_cache.get(key) if usar_cache else None
+        if cached is not None:
+            resultados[i] = cached
+        else:
+            pendientes.setdefault(key, (texto, []))[1].append(i)
+
+    if not pendientes:
+        return resultados
+
+    nlp = get_shared_model("nlp")
+    disable = [pipe for pipe in SPACY_DISABLE if pipe in nlp.pipe_names]
+    docs = nlp.pipe(
+        (texto for texto, _ in pendientes.values()),
+        batch_size=batch_size,
+        n_process=n_process,
+        disable=disable
+    )
+    for (key, (_, indices)), doc in zip(pendientes.items(), docs):
+        lema = lematizar_doc(doc)
+        if usar_cache:
+            corpus_cache.set(key, lema)
+        for i in indices:
+            resultados[i] = lema
+
+    return resultados
+
+# Función de limpieza y lematización
+def procesar_texto(texto):
+    return procesar_textos([texto])[0]
+
 # Unir columnas y procesar
 def crear_corpus(row):
     return procesar_texto(str(row))
 
-
-def get_translation_es_en(text):
-  translated = model_tradu_es_en.generate(**tokenizer_tradu_es_en(text, return_tensors="pt", padding=True))
-  return tokenizer_tradu_es_en.decode(translated[0], skip_special_tokens=True)
-
-def detect_language_and_translate_es_en(list_text):
-    result_list = [] # lista de textos con los idiomas
-    inputs = tokenizer_detected(list_text, padding=True, truncation=True, return_tensors="pt")
+# Versión por lotes de crear_corpus
+def crear_corpus_batch(rows, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS, usar_cache=True):
+    return procesar_textos([str(row) for row in rows], batch_size=batch_size, n_process=n_process, usar_cache=usar_cache)
+
+
+# =================================================================
+# --- DETECCIÓN DE IDIOMA POR NIVELES ---
+# =================================================================
+# 1) Puntaje léxico barato (stopwords, ortografía y sufijos) para los casos claros.
+# 2) XLM-R solo para los textos ambiguos, truncados a un prefijo corto.
+
+# Stopwords exclusivas de cada idioma (las compartidas como "a" o "no" no cuentan)
+_stopwords_solo_es = stopwords_es - stopwords_en
+_stopwords_solo_en = stopwords_en - stopwords_es
+# Las stopwords se quitan en crear_corpus, por eso también se usan rasgos que
+# sobreviven a la lematización
+_chars_es = set("ñáéíóúü")
+_sufijos_es = ("ción", "cion", "ciones", "mente", "dad", "dades", "ería", "ismo", "ando", "iendo")
+_sufijos_en = ("tion", "tions", "ing", "ness", "ship", "ment", "ments", "ity", "ize", "ology")
+
+# Cuántos textos decidió cada nivel
+language_detection_stats = {"lexico": 0, "xlmr": 0, "validacion": None}
+_language_stats_lock = threading.Lock()
+
+def detectar_idioma_lexico(texto):
+    """
+    Puntúa un texto como español o inglés sin modelos.
+    Devuelve (idioma, confianza) o (None, confianza) si el caso no es claro.
+    """
+    votos_es = 0
+    votos_en = 0
+    for token in re.findall(r"\w+", texto.lower()):
+        if token in _stopwords_solo_es or any(c in _chars_es for c in token) or token.endswith(_sufijos_es):
+            votos_es += 1
+        elif token in _stopwords_solo_en or token.endswith(_sufijos_en):
+            votos_en += 1
+
+    total = votos_es + votos_en
+    if total == 0:
+        return None, 0.0
+
+    idioma, votos = ("es", votos_es) if votos_es >= votos_en else ("en", votos_en)
+    confianza = votos / total
+    if total < LANG_LEXICAL_MIN_VOTES or confianza < LANG_LEXICAL_MIN_RATIO:
+        return None, confianza
+    return idioma, confianza
+
+def detectar_idiomas_xlmr(list_text, max_length=LANG_DETECTOR_MAX_LENGTH):
+    """Detecta el idioma con XLM-R en una sola pasada, usando solo un prefijo de cada texto"""
+    if not list_text:
+        return []
+
+    tokenizer_detected, model_detected = get_shared_model("detector")
+    inputs = tokenizer_detected(list_text, padding=True, truncation=True, max_length=max_length, return_tensors="pt")
     with torch.no_grad():
         logits = model_detected(**inputs).logits
 
     preds = torch.softmax(logits, dim=-1)
     id2lang = model_detected.config.id2label
     vals, idxs = torch.max(preds, dim=1)
-    result_list.extend([(id2lang[k.item()], v.item()) for k, v in zip(idxs, vals)])
-
-    list_new_text = []
-    for i in range(len(result_list)):
-        lang = result_list[i][0]
-        if lang == "es":
-            print(f"Translating text {i} from Spanish to English")
-            resp = get_translation_es_en(list_text[i])
-            list_new_text.append(resp)
+    return [(id2lang[k.item()], v.item()) for k, v in zip(idxs, vals)]
+
+def detectar_idiomas(list_text):
+    """
+    Detecta el idioma de cada texto.
+    returns: lista de (idioma, confianza, nivel) con nivel "lexico" o "xlmr"
+    """
+    resultados = [None] * len(list_text)
+    ambiguos = []
+    for i, texto in enumerate(list_text):
+        idioma, confianza = detectar_idioma_lexico(texto)
+        if idioma is None:
+            ambiguos.append(i)
         else:
-            list_new_text.append(list_text[i])
-    
+            resultados[i] = (idioma, confianza, "lexico")
+
+    for i, (idioma, confianza) in zip(ambiguos, detectar_idiomas_xlmr([list_text[i] for i in ambiguos])):
+        resultados[i] = (idioma, confianza, "xlmr")
+
+    with _language_stats_lock:
+        language_detection_stats["lexico"] += len(list_text) - len(ambiguos)
+        language_detection_stats["xlmr"] += len(ambiguos)
+
+    return resultados
+
+def evaluar_detector_idioma(list_text, etiquetas=None):
+    """
+    Mide el nivel léxico contra una lista de validación.
+    Sin etiquetas, la referencia es la salida de XLM-R sobre el texto completo.
+    returns: dict con cobertura del nivel léxico y tasa de acuerdo en los casos que decide
+    """
+    if etiquetas is None:
+        etiquetas = [idioma for idioma, _ in detectar_idiomas_xlmr(list_text, max_length=512)]
+
+    decididos = 0
+    acuerdos = 0
+    for texto, etiqueta in zip(list_text, etiquetas):
+        idioma, _ = detectar_idioma_lexico(texto)
+        if idioma is not None:
+            decididos += 1
+            acuerdos += idioma == etiqueta
+
+    resultado = {
+        "textos": len(list_text),
+        "cobertura_lexico": round(decididos / len(list_text), 4) if list_text else 0.0,
+        "acuerdo_lexico": round(acuerdos / decididos, 4) if decididos else None
+    }
+    with _language_stats_lock:
+        language_detection_stats["validacion"] = resultado
+    return resultado
+
+def validar_detector_idioma(path=LANG_VALIDATION_PATH):
+    """
+    Evalúa el nivel léxico con la lista etiquetada de path (JSONL con text y lang).
+    Los textos pasan por crear_corpus igual que en las predicciones, así se mide sobre
+    lo mismo que ve el detector. El resultado queda en language_detection_stats["validacion"].
+    """
+    with open(path, encoding="utf-8") as f:
+        filas = [json.loads(line) for line in f if line.strip()]
+    corpus = crear_corpus_batch([fila["text"] for fila in filas], usar_cache=False)
+    return evaluar_detector_idioma(corpus, [fila["lang"] for fila in filas])
+
+# Cache de traducciones (clave: dirección, checkpoint y hash del texto normalizado)
+translation_cache = TieredCache(
+    "traduccion:",
+    maxsize=TRANSLATION_CACHE_MAXSIZE,
+    ttl=TRANSLATION_CACHE_TTL,
+    use_redis=TRANSLATION_CACHE_REDIS
+)
+
+def _translation_key(text, direccion):
+    normalized = " ".join(text.split())
+    return f"{direccion}:{translation_checkpoints[direccion]}:{TRANSLATION_PRECISION}:{hash_texto(normalized)}"
+
+def _generate_translations(list_text, direccion, batch_size):
+    """
+    Traduce una lista de textos con una llamada a generate por lote.
+    Los textos se ordenan por longitud en tokens para que cada lote tenga poco
+    padding, y las traducciones se devuelven en el orden original.
+    """
+    tokenizer, model = get_shared_model(direccion)
+    lengths = [len(ids) for ids in tokenizer(list_text, truncation=True)["input_ids"]]
+    orden = sorted(range(len(list_text)), key=lambda i: lengths[i])
+
+    list_new_text = [None] * len(list_text)
+    for i in range(0, len(orden), batch_size):
+        batch_idx = orden[i:i+batch_size]
+        inputs = tokenizer([list_text[j] for j in batch_idx], return_tensors="pt", padding=True, truncation=True)
+        with forward_slots, torch.no_grad():
+            translated = model.generate(**inputs)
+        decoded = tokenizer.batch_decode(translated, skip_special_tokens=True)
+        for j, text in zip(batch_idx, decoded):
+            list_new_text[j] = text
+
     return list_new_text
 
+def traducir_lote(list_text, direccion, batch_size=TRANSLATION_BATCH_SIZE):
+    """
+    Traduce una lista de textos en la dirección indicada ("es_en" o "en_es").
+    Las traducciones ya hechas salen de translation_cache; solo los textos
+    nuevos (sin repetidos) pasan por el modelo.
+    """
+    if not list_text:
+        return []
+
+    keys = [_translation_key(text, direccion) for text in list_text]
+    list_new_text = translation_cache.get_many(keys)
+
+    pendientes = {}
+    for i, (key, cached) in enumerate(zip(keys, list_new_text)):
+        if cached is None:
+            pendientes.setdefault(key, []).append(i)
+
+    if pendientes:
+        textos = [list_text[indices[0]] for indices in pendientes.values()]
+        traducciones = _generate_translations(textos, direccion, batch_size)
+        translation_cache.set_many(list(zip(pendientes.keys(), traducciones)))
+        for indices, text in zip(pendientes.values(), traducciones):
+            for i in indices:
+                list_new_text[i] = text
 
-def get_translation_en_es(text):
-  translated = model_tradu_en_es.generate(**tokenizer_tradu_en_es(text, return_tensors="pt", padding=True))
-  return tokenizer_tradu_en_es.decode(translated[0], skip_special_tokens=True)
+    return list_new_text
 
-def detect_language_and_translate_en_es(list_text):
-    result_list = [] # lista de textos con los idiomas
-    inputs = tokenizer_detected(list_text, padding=True, truncation=True, return_tensors="pt")
-    with torch.no_grad():
-        logits = model_detected(**inputs).logits
+def traducir_por_idioma(list_text, idioma_origen, direccion, idiomas=None, lematizar=False):
+    """
+    Traduce solo los textos detectados en idioma_origen, el resto se devuelve igual
+    idiomas: resultado de detectar_idiomas(list_text) si ya se calculó (se reutiliza entre direcciones)
+    lematizar: pasa las traducciones por crear_corpus (cuando list_text ya viene lematizado)
+    """
+    if idiomas is None:
+        idiomas = detectar_idiomas(list_text)
+    indices = [i for i, (lang, _, _) in enumerate(idiomas) if lang == idioma_origen]
+
+    list_new_text = list(list_text)
+    if indices:
+        print(f"Traduciendo {len(indices)} de {len(list_text)} textos desde '{idioma_origen}'")
+        traducciones = traducir_lote([list_text[i] for i in indices], direccion)
+        if lematizar:
+            traducciones = crear_corpus_batch(traducciones)
+        for i, text in zip(indices, traducciones):
+            list_new_text[i] = text
 
-    preds = torch.softmax(logits, dim=-1)
-    id2lang = model_detected.config.id2label
-    vals, idxs = torch.max(preds, dim=1)
-    result_list.extend([(id2lang[k.item()], v.item()) for k, v in zip(idxs, vals)])
-
-    list_new_text = []
-    for i in range(len(result_list)):
-        lang = result_list[i][0]
-        if lang == "en":
-            print(f"traduciendo el texto {i} de Inglés a Español")
-            resp = get_translation_en_es(list_text[i])
-            list_new_text.append(resp)
-        else:
-            list_new_text.append(list_text[i])
-    
     return list_new_text
 
 
+def get_translation_es_en(text):
+    return traducir_lote([text], "es_en")[0]
+
+def detect_language_and_translate_es_en(list_text):
+    return traducir_por_idioma(list_text, "es", "es_en")
+
+
+def get_translation_en_es(text):
+    return traducir_lote([text], "en_es")[0]
+
+def detect_language_and_translate_en_es(list_text):
+    return traducir_por_idioma(list_text, "en", "en_es")
+
+
+# Texto ya lematizado para calentar modelos (no importa el idioma, solo ejercitar el forward)
+WARMUP_TEXT = "sustainable development research project technology education community"
+
+def agrupar_por_longitud(lengths, batch_size, max_tokens):
+    """
+    Agrupa índices de textos en lotes ordenados por longitud en tokens.
+    Cada lote tiene como máximo batch_size textos y su tamaño con padding
+    (textos x longitud del más largo) no pasa de max_tokens, salvo un texto solo.
+    """
+    orden = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for i in orden:
+        # En orden creciente, el texto actual es el más largo del lote
+        if batch and (len(batch) >= batch_size or (len(batch) + 1) * lengths[i] > max_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def artifacts_version(model_dir, *variant):
+    """
+    Versión de los artefactos cargados: fecha del archivo más reciente del directorio
+    del modelo más la variante (backend, precisión). Se guarda en model_data al cargar,
+    así un modelo viejo en memoria no se confunde con uno reentrenado en la misma carpeta.
+    """
+    mtimes = [entry.stat().st_mtime for entry in os.scandir(model_dir) if entry.is_file()]
+    return "-".join([str(int(max(mtimes, default=0))), *variant])
+
+def torch_model_size_bytes(model):
+    """Bytes que ocupan los parámetros y buffers de un modelo de torch"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
 class ModelLoader:
     """Clase para cargar y usar modelos guardados"""
     
     def __init__(self, tipo='ods'):
         self.models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), tipo) # ruta absoluta al directorio de modelos
-        self.loaded_models = {}
+        self.loaded_models = ModelCache(max_models=MODEL_CACHE_MAX_MODELS, max_bytes=MODEL_CACHE_MAX_BYTES)
         self.tipo = tipo
+        self.index = ModelIndex(self.models_dir, tipo) # modelos disponibles en disco
+        self.load_times = {} # segundos que tardó la última carga de cada modelo
+        self._load_flight = SingleFlight()
+        self._batchers = {} # MicroBatcher por modelo transformer
+        self._batchers_lock = threading.Lock()
+        self.aliases = {} # alias (p. ej. "default") -> model_folder
+        self.swaps = {} # estado del último cambio de cada alias
+        self._swaps_lock = threading.Lock()
+        self._in_use = {} # peticiones en curso por modelo
+        self._in_use_cond = threading.Condition()
         print(f"ModelLoader initialized for type: {self.tipo} with models directory: {self.models_dir}")
   
-    def load_traditional_model(self, model_folder):
-        """Carga modelo tradicional"""
+    def load_traditional_model(self, model_folder, pin=False):
+        """Carga modelo tradicional (pin=True lo protege de la expulsión del cache)"""
         model_dir = f"{self.models_dir}/traditional/{model_folder}"
 
         if not os.path.exists(model_dir):
             raise FileNotFoundError(f"Modelo no encontrado: {model_dir}")
         
         print(f"📥 Cargando modelo tradicional: {model_folder}")
+        inicio = time.perf_counter()
         
         # Cargar componentes
         model_path = f"{model_dir}/model.pkl"
         vectorizer_path = f"{model_dir}/vectorizer.pkl"
         
-        model = joblib.load(model_path)
-        vectorizer = joblib.load(vectorizer_path)
+        # Con MODEL_MMAP se prefieren los *.mmap.joblib (arrays compartidos desde el page cache)
+        load = load_joblib if MODEL_MMAP else lambda path: (joblib.load(path), path)
+        model, model_path = load(model_path)
+        vectorizer, vectorizer_path = load(vectorizer_path)
+        loaded_paths = [model_path, vectorizer_path]
 
         # try open label enconder
         label_path = f"{model_dir}/label_encoder.pkl"
         label_encoder = None
         try:
-            label_encoder = joblib.load(label_path)
+            label_encoder, label_path = load(label_path)
+            loaded_paths.append(label_path)
         except FileNotFoundError:
             print("No tiene label encoder")
         except Exception as e:
             print(f"Error al cargar label encoder: {e}")
         
         # Guardar en cache
-        self.loaded_models[model_folder] = {
+        model_data = {
             'type': 'traditional',
             'model': model,
             'vectorizer': vectorizer,
-            'label_encoder': label_encoder
+            'label_encoder': label_encoder,
+            'version': artifacts_version(model_dir)
         }
+        size_bytes = sum(os.path.getsize(path) for path in loaded_paths)
+        self.loaded_models.put(model_folder, model_data, size_bytes=size_bytes, pin=pin)
+        self.load_times[model_folder] = round(time.perf_counter() - inicio, 3)
         
-        print(f"   ✅ Modelo cargado exitosamente")
-        # return model, vectorizer, label_encoder
-
-    def load_transformer_model(self, model_folder, device=None):
-        """Carga modelo transformer"""
+        print(f"   ✅ Modelo cargado exitosamente ({size_bytes / 1e6:.1f} MB en {self.load_times[model_folder]}s)")
+        return model_data
+
+    def load_transformer_model(self, model_folder, device=None, pin=False, backend=None):
+        """
+        Carga modelo transformer (pin=True lo protege de la expulsión del cache)
+        backend: "torch" u "onnx" (None = según TRANSFORMER_BACKENDS). Si el modelo
+        no tiene un model.onnx verificado, se usa torch.
+        """
         model_dir = f"{self.models_dir}/transformers/{model_folder}"
 
         if not os.path.exists(model_dir):
             raise FileNotFoundError(f"Modelo no encontrado: {model_dir}")
         
         print(f"📥 Cargando modelo transformer: {model_folder}")
+        inicio = time.perf_counter()
         
         # Detectar dispositivo
         if device is None:
@@ -182,11 +541,42 @@ class ModelLoader:
             else:
                 device = "cpu"
         
-        print(f"   🔧 Usando dispositivo: {device}")        
+        if backend is None:
+            backend = TRANSFORMER_BACKENDS.get(model_folder, TRANSFORMER_BACKEND_DEFAULT)
+        if backend == "onnx":
+            ready, motivo = onnx_ready(model_dir)
+            if not ready:
+                print(f"   ⚠️ Backend ONNX no disponible ({motivo}), se usa torch")
+                backend = "torch"
+            else:
+                device = "cpu" # ONNX Runtime se usa solo en CPU
+
+        # Precisión del modelo de torch: fp32 o int8 (cuantización dinámica, solo CPU)
+        precision = TRANSFORMER_PRECISION.get(model_folder, TRANSFORMER_PRECISION_DEFAULT) if backend == "torch" else "fp32"
+        if precision == "int8":
+            if os.path.exists(quantized_path(model_dir)):
+                device = "cpu"
+            else:
+                print(f"   ⚠️ No existe {os.path.basename(quantized_path(model_dir))}, se usa fp32")
+                precision = "fp32"
+
+        print(f"   🔧 Usando dispositivo: {device} (backend: {backend}, precisión: {precision})")        
         tokenizer = AutoTokenizer.from_pretrained(model_dir)
-        model = AutoModelForSequenceClassification.from_pretrained(model_dir)
-        model = model.to(device)
-        model.eval()
+        if backend == "onnx":
+            model = OnnxClassifier(onnx_path(model_dir))
+        elif precision == "int8":
+            model = load_quantized(model_dir, model_dir, AutoModelForSequenceClassification)
+        else:
+            model = None
+            if MODEL_MMAP and os.path.exists(safetensors_path(model_dir)):
+                try:
+                    model = load_classifier_mmap(model_dir) # pesos mapeados desde model.safetensors
+                except Exception as e:
+                    print(f"   ⚠️ No se pudo mapear {os.path.basename(safetensors_path(model_dir))} ({e}), se usa from_pretrained")
+            if model is None:
+                model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+            model = model.to(device)
+            model.eval()
 
         # try open label enconder
         label_path = f"{model_dir}/label_encoder.pkl"
@@ -199,130 +589,346 @@ class ModelLoader:
             print(f"Error al cargar label encoder: {e}")
         
         # Guardar en cache
-        self.loaded_models[model_folder] = {
+        model_data = {
             'type': 'transformer',
+            'backend': backend,
+            'precision': precision,
             'model': model,
             'tokenizer': tokenizer,
             'device': device,
-            'label_encoder': label_encoder
+            'label_encoder': label_encoder,
+            'version': artifacts_version(model_dir, backend, precision)
         }
+        if backend == "onnx":
+            size_bytes = model.size_bytes()
+        elif precision == "int8":
+            # Las capas cuantizadas no aparecen en parameters(), se usa el tamaño del artefacto
+            size_bytes = os.path.getsize(quantized_path(model_dir))
+        else:
+            size_bytes = torch_model_size_bytes(model)
+        self.loaded_models.put(model_folder, model_data, size_bytes=size_bytes, pin=pin)
+        self.load_times[model_folder] = round(time.perf_counter() - inicio, 3)
         
-        print(f"   ✅ Modelo cargado exitosamente")
-        # return model, tokenizer
+        print(f"   ✅ Modelo cargado exitosamente ({size_bytes / 1e6:.1f} MB en {self.load_times[model_folder]}s)")
+        return model_data
     
+    def get_model_data(self, model_folder, model_type):
+        """
+        Devuelve el modelo desde el cache o lo carga.
+        Si varias peticiones piden a la vez un modelo que no está en memoria, solo
+        una lo carga y las demás esperan su resultado (o su excepción).
+        """
+        model_data = self.loaded_models.get(model_folder)
+        if model_data is not None:
+            return model_data
+
+        print("Modelo no encontrado en memoria, procediendo a cargarlo...")
+        return self._load_flight.do((model_type, model_folder), self._load_once, model_folder, model_type)
+
+    def _load_once(self, model_folder, model_type):
+        # Otra petición pudo terminar la carga justo antes de entrar aquí
+        model_data = self.loaded_models.get(model_folder)
+        if model_data is not None:
+            return model_data
+        if model_type == 'traditional':
+            return self.load_traditional_model(model_folder)
+        return self.load_transformer_model(model_folder)
+
+    # =================================================================
+    # --- ALIAS Y CAMBIO DE MODELO EN CALIENTE ---
+    # =================================================================
+
+    def set_alias(self, alias, model_folder):
+        self.aliases[alias] = model_folder
+
+    def resolve_alias(self, name):
+        """Devuelve el model_folder de un alias, o el mismo nombre si no es un alias"""
+        return self.aliases.get(name, name)
+
+    @contextmanager
+    def use_model(self, model_folder):
+        """Cuenta las peticiones en curso de un modelo para poder drenarlo antes de liberarlo"""
+        with self._in_use_cond:
+            self._in_use[model_folder] = self._in_use.get(model_folder, 0) + 1
+        try:
+            yield
+        finally:
+            with self._in_use_cond:
+                self._in_use[model_folder] -= 1
+                if self._in_use[model_folder] == 0:
+                    del self._in_use[model_folder]
+                    self._in_use_cond.notify_all()
+
+    def release_when_idle(self, model_folder, timeout=MODEL_DRAIN_TIMEOUT):
+        """Espera a que terminen las peticiones que usan el modelo y lo quita de memoria"""
+        with self._in_use_cond:
+            drained = self._in_use_cond.wait_for(lambda: model_folder not in self._in_use, timeout=timeout)
+        if not drained:
+            print(f"[DIAGNÓSTICO WARN] {model_folder} sigue en uso después de {timeout}s, se libera igual")
+        self.loaded_models.pop(model_folder)
+        with self._batchers_lock:
+            batcher = self._batchers.pop(model_folder, None)
+        if batcher is not None:
+            batcher.close()
+        print(f"♻️ Modelo {model_folder} liberado")
+
+    def warmup_model(self, model_folder, model_type, texts=None):
+        """
+        Predicción sintética para pagar las asignaciones perezosas antes de recibir tráfico.
+        Va directo al forward (sin micro-batcher ni caches de predicción)
+        texts: textos ya lematizados, por defecto WARMUP_TEXT
+        """
+        texts = texts if texts is not None else [WARMUP_TEXT]
+        if model_type == 'traditional':
+            self.predict_traditional(model_folder, texts, preprocessed=True)
+        else:
+            self.predict_transformer(model_folder, texts, preprocessed=True, microbatch=False)
+
+    def begin_swap(self, alias, model_folder):
+        """Registra un cambio de alias; devuelve None si ya hay uno en curso para ese alias"""
+        with self._swaps_lock:
+            estado = self.swaps.get(alias)
+            if estado is not None and estado["finished_at"] is None:
+                return None
+            estado = {"status": "pending", "from": self.aliases.get(alias), "to": model_folder, "error": None, "started_at": time.time(), "finished_at": None}
+            self.swaps[alias] = estado
+            return estado
+
+    def swap_model(self, alias, model_folder, estado=None):
+        """
+        Carga y calienta model_folder y luego cambia el alias de forma atómica.
+        El modelo anterior se drena (se esperan sus peticiones en curso) y se libera,
+        salvo que otro alias lo siga usando.
+        estado: el devuelto por begin_swap si el cambio ya se registró
+        """
+        if estado is None:
+            estado = self.begin_swap(alias, model_folder)
+            if estado is None:
+                raise RuntimeError(f"Ya hay un cambio en curso para el alias {alias}")
+        model_type = self.index.model_type(model_folder)
+        previous = estado["from"]
+        estado["status"] = "loading"
+        print(f"🔄 Cambiando alias {self.tipo}/{alias}: {previous} -> {model_folder}")
+
+        was_pinned = self.loaded_models.is_pinned(model_folder)
+        try:
+            if model_type is None:
+                raise FileNotFoundError(f"Modelo no encontrado: {model_folder}")
+            self.get_model_data(model_folder, model_type)
+            self.loaded_models.pin(model_folder)
+
+            estado["status"] = "warming"
+            inicio = time.perf_counter()
+            self.warmup_model(model_folder, model_type)
+            estado["warmup_seconds"] = round(time.perf_counter() - inicio, 3)
+
+            # Cambio atómico: las peticiones nuevas ya resuelven el alias al modelo nuevo
+            self.aliases[alias] = model_folder
+            estado["status"] = "switched"
+        except Exception as e:
+            # El modelo nuevo no queda fijado en memoria si el cambio falló
+            if not was_pinned:
+                self.loaded_models.unpin(model_folder)
+            estado["status"] = "failed"
+            estado["error"] = str(e)
+            estado["finished_at"] = time.time()
+            print(f"❌ Falló el cambio de {self.tipo}/{alias}: {e}")
+            return estado
+
+        if previous is not None and previous != model_folder and previous not in self.aliases.values():
+            estado["status"] = "draining"
+            self.loaded_models.unpin(previous)
+            self.release_when_idle(previous)
+
+        estado["status"] = "done"
+        estado["finished_at"] = time.time()
+        print(f"   ✅ Alias {self.tipo}/{alias} apunta a {model_folder}")
+        return estado
+
+    def stats(self):
+        stats = self.loaded_models.stats()
+        stats["load_times"] = dict(self.load_times)
+        stats["loading"] = [folder for _, folder in self._load_flight.in_flight()]
+        stats["microbatch"] = {folder: batcher.stats() for folder, batcher in self._batchers.items()}
+        stats["aliases"] = dict(self.aliases)
+        stats["in_use"] = dict(self._in_use)
+        return stats
+
     '''
-    predictions: lista de enteros (índices de clases)
-    probabilities: lista de listas de probabilidades
+    predictions: array de enteros (índices de clases)
+    probabilities: matriz float32 contigua (textos x clases), None si el modelo no tiene predict_proba
     label_encoder: para convertir índices a nombres de clases (si carrera)
+    preprocessed: True si los textos ya vienen lematizados con crear_corpus
     
     returns: predictions, probabilities, label_encoder.classes_ (if carrera)
     '''
-    def predict_traditional(self, model_folder, texts):
+    def predict_traditional(self, model_folder, texts, preprocessed=False):
         """Predicción con modelo tradicional"""
+        with self.use_model(model_folder):
+            return self._predict_traditional(model_folder, texts, preprocessed)
+
+    def _predict_traditional(self, model_folder, texts, preprocessed=False):
         print(f"🔍 Cargando modelo tradicional: {model_folder}")
-        if model_folder not in self.loaded_models:
-            print("Modelo no encontrado en memoria, procediendo a cargarlo...")
-            self.load_traditional_model(model_folder)
+        # Se toma una referencia local: si el cache expulsa el modelo durante la
+        # predicción, esta petición lo sigue usando sin problema
+        model_data = self.get_model_data(model_folder, 'traditional')
 
-        model_data = self.loaded_models[model_folder]
         model = model_data['model']
         vectorizer = model_data['vectorizer']
         label_encoder = model_data['label_encoder'] # si no es carrera esta vacio
 
         print(f"🔍 Procesando {len(texts)} textos para predicción...")
-        new_list_lema = []
-        for text in texts:
-            new_list_lema.append(crear_corpus(text))
+        new_list_lema = texts if preprocessed else crear_corpus_batch(texts)
 
         # Vectorizar textos
-        X_vec = vectorizer.transform(new_list_lema)
-        
-        # Predicciones
-        predictions = model.predict(X_vec)
-        probabilities = None
-        
-        # Obtener probabilidades si el modelo las soporta
-        if hasattr(model, 'predict_proba'):
-            probabilities = model.predict_proba(X_vec)
+        with forward_slots:
+            X_vec = vectorizer.transform(new_list_lema)
+
+            # Predicciones
+            predictions = model.predict(X_vec)
+            probabilities = None
 
-        # Convertir de numpy a listas antes de retornar
-        predictions_list = predictions.tolist() if hasattr(predictions, 'tolist') else predictions
-        probabilities_list = probabilities.tolist() if probabilities is not None and hasattr(probabilities, 'tolist') else probabilities
+            # Obtener probabilidades si el modelo las soporta
+            if hasattr(model, 'predict_proba'):
+                probabilities = model.predict_proba(X_vec)
+
+        # Se devuelven arrays de numpy; la conversión a listas se hace al serializar la respuesta
+        predictions = np.asarray(predictions)
+        if probabilities is not None:
+            probabilities = np.ascontiguousarray(probabilities, dtype=np.float32)
 
         if self.tipo == "carrera":
-            return predictions_list, probabilities_list, label_encoder.classes_.tolist() if label_encoder is not None else None
+            return predictions, probabilities, label_encoder.classes_.tolist() if label_encoder is not None else None
 
-        return predictions_list, probabilities_list
+        return predictions, probabilities
     
     '''
-    predictions: lista de enteros (índices de clases)
-    probabilities: lista de listas de probabilidades
+    predictions: array de enteros (índices de clases)
+    probabilities: matriz float32 contigua (textos x clases), None si el modelo no tiene predict_proba
     label_encoder: para convertir índices a nombres de clases (si carrera)
+    preprocessed: True si los textos ya vienen lematizados con crear_corpus
+    microbatch: juntar los textos con los de otras peticiones concurrentes (None = según MICROBATCH_ENABLED)
 
     returns: predictions, probabilities, label_encoder.classes_ (if carrera)
     '''
-    def predict_transformer(self, model_folder, texts, batch_size=16):
-        print(f"🔍 Cargando modelo transformer: {model_folder}")
+    def predict_transformer(self, model_folder, texts, batch_size=16, preprocessed=False, microbatch=None):
         """Predicción con modelo transformer"""
-        if model_folder not in self.loaded_models:
-            print("Modelo no encontrado en memoria, procediendo a cargarlo...")
-            self.load_transformer_model(model_folder)
+        with self.use_model(model_folder):
+            return self._predict_transformer(model_folder, texts, batch_size, preprocessed, microbatch)
 
-        model_data = self.loaded_models[model_folder]
-        model = model_data['model']
-        tokenizer = model_data['tokenizer']
-        device = model_data['device']
+    def _predict_transformer(self, model_folder, texts, batch_size=16, preprocessed=False, microbatch=None):
+        print(f"🔍 Cargando modelo transformer: {model_folder}")
+        model_data = self.get_model_data(model_folder, 'transformer')
         label_encoder = model_data['label_encoder'] # si no es carrera esta vacio
 
         print(f"🔍 Procesando {len(texts)} textos para predicción...")
-        new_list_lema = []
-        for text in texts:
-            new_list_lema.append(crear_corpus(text))
-        
-        predictions = []
-        probabilities = []
+        new_list_lema = texts if preprocessed else crear_corpus_batch(texts)
+
+        # Pocas peticiones de textos individuales se juntan en un solo forward
+        if microbatch is None:
+            microbatch = MICROBATCH_ENABLED and len(new_list_lema) < MICROBATCH_MAX_BATCH_SIZE
+        if microbatch:
+            try:
+                batcher = self._get_batcher(model_folder)
+                futures = [batcher.submit(text) for text in new_list_lema]
+                results = [future.result(timeout=MICROBATCH_RESULT_TIMEOUT) for future in futures]
+                predictions = np.array([pred for pred, _ in results], dtype=np.int64)
+                probabilities = np.stack([probs for _, probs in results]) if results else np.empty((0, 0), dtype=np.float32)
+            except BatcherClosedError:
+                # El modelo se liberó (cambio de alias) después de tomar su model_data:
+                # se hace el forward directo con la referencia que ya tiene esta petición
+                microbatch = False
+            except FutureTimeoutError:
+                # El micro-batcher no dio abasto: se retiran los textos que aún no entraron
+                # a un lote y se responde 503 igual que cuando el ejecutor está lleno
+                for future in futures:
+                    future.cancel()
+                print(f"[DIAGNÓSTICO WARN] {model_folder}: sin resultado del micro-batcher en {MICROBATCH_RESULT_TIMEOUT}s")
+                raise service_overloaded()
+        if not microbatch:
+            with forward_slots:
+                predictions, probabilities = self._forward_transformer(model_data, new_list_lema, batch_size)
 
         if self.tipo == "carrera":
-            label_encoder
-        
-        # Procesar en lotes
-        for i in range(0, len(new_list_lema), batch_size):
-            batch_texts = new_list_lema[i:i+batch_size]
-            
-            # Tokenizar
-            inputs = tokenizer(
-                batch_texts,
-                truncation=True,
-                padding=True,
-                max_length=512,
-                return_tensors='pt'
-            )
-            
-            # Mover al dispositivo
-            inputs = {k: v.to(device) for k, v in inputs.items()}
-            
-            # Predicción
-            with torch.no_grad():
-                outputs = model(**inputs)
-                logits = outputs.logits
-                
-                # Probabilidades
-                probs = torch.softmax(logits, dim=-1)
-                probabilities.extend(probs.cpu().numpy())
-                
-                # Predicciones
-                preds = torch.argmax(logits, dim=-1)
-                predictions.extend(preds.cpu().numpy())
-        
-        # Convertir a lista y entero cada elemento interno de predictions y probabilities  
-        tmp_predictions = predictions.copy()
-        for i, pred in enumerate(tmp_predictions):
-            predictions[i] = int(pred)
-            probabilities[i] = probabilities[i].tolist() if probabilities is not None else None
+            return predictions, probabilities, label_encoder.classes_.tolist() if label_encoder is not None else None
 
+        return predictions, probabilities
 
-        if self.tipo == "carrera":
-            return predictions, probabilities, label_encoder.classes_.tolist() if label_encoder is not None else None
+    def _forward_transformer(self, model_data, texts, batch_size=16, max_tokens=TRANSFORMER_MAX_TOKENS_PER_BATCH):
+        """
+        Forward del transformer sobre textos ya lematizados.
+        Los textos se agrupan por longitud en tokens y cada lote se rellena solo hasta
+        su texto más largo; los resultados vuelven en el orden original.
+        """
+        model = model_data['model']
+        tokenizer = model_data['tokenizer']
+        device = model_data['device']
+
+        predictions = np.empty(len(texts), dtype=np.int64)
+        probabilities = None # matriz float32 (textos x clases), se crea con el primer lote
+        if not texts:
+            return predictions, np.empty((0, 0), dtype=np.float32)
+
+        # Tokenizar una sola vez, sin padding, para conocer la longitud de cada texto
+        encodings = tokenizer(texts, truncation=True, max_length=512)
+        lengths = [len(ids) for ids in encodings['input_ids']]
+
+        # Procesar en lotes de longitud parecida
+        for batch_idx in agrupar_por_longitud(lengths, batch_size, max_tokens):
+            features = [{k: encodings[k][i] for k in encodings.keys()} for i in batch_idx]
+            if model_data.get('backend') == "onnx":
+                inputs = tokenizer.pad(features, padding=True, return_tensors='np')
+                logits = model.logits(inputs)
+
+                # Probabilidades (softmax estable) y predicciones
+                exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+                probs = exp / exp.sum(axis=-1, keepdims=True)
+                preds = logits.argmax(axis=-1)
+            else:
+                inputs = tokenizer.pad(features, padding=True, return_tensors='pt')
+
+                # Mover al dispositivo
+                inputs = {k: v.to(device) for k, v in inputs.items()}
+
+                # Predicción
+                with torch.no_grad():
+                    outputs = model(**inputs)
+                    logits = outputs.logits
+
+                    # Probabilidades
+                    probs = torch.softmax(logits, dim=-1).cpu().numpy()
+
+                    # Predicciones
+                    preds = torch.argmax(logits, dim=-1).cpu().numpy()
+
+            # Volver al orden original (asignación por índices, sin listas por texto)
+            if probabilities is None:
+                probabilities = np.empty((len(texts), probs.shape[-1]), dtype=np.float32)
+            predictions[batch_idx] = preds
+            probabilities[batch_idx] = probs
 
         return predictions, probabilities
-    
+
+    def _get_batcher(self, model_folder):
+        """MicroBatcher del modelo (uno por model_folder, creado en el primer uso)"""
+        with self._batchers_lock:
+            batcher = self._batchers.get(model_folder)
+            if batcher is None:
+                def batch_fn(batch_texts):
+                    # Se resuelve el modelo en cada lote por si el cache lo expulsó
+                    model_data = self.get_model_data(model_folder, 'transformer')
+                    with forward_slots:
+                        predictions, probabilities = self._forward_transformer(model_data, batch_texts, batch_size=len(batch_texts))
+                    return list(zip(predictions, probabilities))
+
+                batcher = MicroBatcher(
+                    f"{self.tipo}-{model_folder}", batch_fn,
+                    max_batch_size=MICROBATCH_MAX_BATCH_SIZE, max_wait_ms=MICROBATCH_MAX_WAIT_MS
+                )
+                self._batchers[model_folder] = batcher
+            return batcher
+
+
+if __name__ == "__main__":
+    # Validación del detector de idioma: python -m app.models.ModelLoader
+    print(json.dumps(validar_detector_idioma(), indent=2))
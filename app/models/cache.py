@@ -0,0 +1,289 @@
+from collections import OrderedDict
+import threading
+import hashlib
+import json
+import time
+
+import redis
+
+from app.consts import REDIS_HOST, REDIS_PORT, REDIS_STORE_DB_INDEX, CACHE_REDIS_RETRY_SECONDS
+
+
+def hash_texto(texto):
+    """Hash estable del contenido de un texto (clave de los caches)"""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Cache en memoria con tamaño máximo y expulsión LRU.
+    Es seguro entre hilos y lleva contadores de aciertos, fallos y expulsiones.
+    ttl: segundos de vida de cada entrada (None = sin expiración)
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize
+        }
+
+
+class TieredCache:
+    """
+    Cache de dos niveles: LRU en memoria delante de Redis (REDIS_STORE_DB_INDEX).
+    Los valores se guardan en Redis como JSON con el mismo ttl que en memoria.
+    Si Redis no responde, el cache sigue funcionando solo en memoria y se
+    reintenta la conexión después de CACHE_REDIS_RETRY_SECONDS.
+    """
+
+    def __init__(self, prefix, maxsize=1024, ttl=None, use_redis=True):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.use_redis = use_redis
+        self._redis = None
+        self._redis_retry_at = 0.0
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+
+    def _client(self):
+        if not self.use_redis or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis(
+                host=REDIS_HOST, port=REDIS_PORT, db=REDIS_STORE_DB_INDEX,
+                decode_responses=True, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+        return self._redis
+
+    def _redis_failed(self, e):
+        self.redis_errors += 1
+        self._redis_retry_at = time.monotonic() + CACHE_REDIS_RETRY_SECONDS
+        print(f"[DIAGNÓSTICO WARN] Cache '{self.prefix}' sin Redis por {CACHE_REDIS_RETRY_SECONDS}s: {e}")
+
+    def get_many(self, keys):
+        """Devuelve una lista con el valor de cada clave (None si no existe)"""
+        values = [self.memory.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+
+        client = self._client()
+        if missing and client is not None:
+            try:
+                raws = client.mget([self.prefix + keys[i] for i in missing])
+            except redis.RedisError as e:
+                self._redis_failed(e)
+                return values
+            for i, raw in zip(missing, raws):
+                if raw is None:
+                    self.redis_misses += 1
+                    continue
+                self.redis_hits += 1
+                values[i] = json.loads(raw)
+                self.memory.set(keys[i], values[i])
+
+        return values
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def set_many(self, items):
+        """items: lista de tuplas (clave, valor)"""
+        for key, value in items:
+            self.memory.set(key, value)
+
+        client = self._client()
+        if not items or client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, value in items:
+                pipe.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def delete(self, key):
+        self.memory.delete(key)
+        client = self._client()
+        if client is None:
+            return
+        try:
+            client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def stats(self):
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.redis_hits
+        return {
+            "memory": memory,
+            "redis_hits": self.redis_hits,
+            "redis_misses": self.redis_misses,
+            "redis_errors": self.redis_errors,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "ttl": self.ttl
+        }
+
+
+class ModelCache:
+    """
+    Cache de modelos cargados (model_folder -> model_data) con presupuesto de memoria.
+    max_models / max_bytes: límites de cantidad y de bytes (None = sin límite)
+    Al superar el presupuesto se expulsa el modelo usado hace más tiempo, salvo los
+    fijados con pin. Expulsar solo quita la referencia del cache: una petición que ya
+    tiene el model_data lo sigue usando y la memoria se libera cuando termina.
+    """
+
+    def __init__(self, max_models=None, max_bytes=None):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._pinned = set()
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def put(self, key, model_data, size_bytes=0, pin=False):
+        with self._lock:
+            self._data[key] = model_data
+            self._data.move_to_end(key)
+            self._sizes[key] = size_bytes
+            if pin:
+                self._pinned.add(key)
+            self._evict(keep=key)
+
+    def __setitem__(self, key, model_data):
+        self.put(key, model_data)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self._sizes.pop(key, None)
+            self._pinned.discard(key)
+            return self._data.pop(key, default)
+
+    def pin(self, key):
+        with self._lock:
+            if key in self._data:
+                self._pinned.add(key)
+
+    def is_pinned(self, key):
+        with self._lock:
+            return key in self._pinned
+
+    def unpin(self, key):
+        with self._lock:
+            self._pinned.discard(key)
+            self._evict()
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _over_budget(self):
+        if self.max_models is not None and len(self._data) > self.max_models:
+            return True
+        return self.max_bytes is not None and sum(self._sizes.values()) > self.max_bytes
+
+    def _evict(self, keep=None):
+        while self._over_budget():
+            victim = next((k for k in self._data if k not in self._pinned and k != keep), None)
+            if victim is None:
+                print("[DIAGNÓSTICO WARN] Presupuesto de modelos excedido solo con modelos fijados o en uso")
+                return
+            print(f"♻️ Liberando modelo por presupuesto de memoria: {victim} ({self._sizes.get(victim, 0) / 1e6:.1f} MB)")
+            del self._data[victim]
+            self._sizes.pop(victim, None)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": [
+                    {"name": k, "size_bytes": self._sizes.get(k, 0), "pinned": k in self._pinned}
+                    for k in self._data
+                ],
+                "total_bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "max_models": self.max_models,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,126 @@
+from concurrent.futures import Future
+import threading
+import queue
+import time
+
+from app.metrics import Histogram
+
+# Marca en la cola para detener el hilo (close)
+_STOP = object()
+
+
+class BatcherClosedError(RuntimeError):
+    """El MicroBatcher ya se cerró (su modelo se liberó); la petición debe usar otro camino"""
+
+
+class MicroBatcher:
+    """
+    Cola de peticiones por modelo que junta textos individuales en un solo forward.
+    Un hilo toma el primer texto de la cola y espera hasta max_wait_ms por más,
+    sin pasar de max_batch_size. Cada petición recibe su resultado en un Future.
+
+    batch_fn: función que recibe una lista de textos y devuelve una lista de
+              resultados en el mismo orden
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=16, max_wait_ms=10):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_wait_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 250, 1000])
+
+    def submit(self, item):
+        """Encola un texto y devuelve el Future con su resultado (BatcherClosedError si ya se cerró)"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise BatcherClosedError(f"MicroBatcher {self.name} cerrado")
+            # El hilo se crea en el primer uso (después de un fork, no antes)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"microbatch-{self.name}", daemon=True)
+                self._thread.start()
+            self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def close(self):
+        """
+        Detiene el hilo después de atender lo que ya está en la cola. Desde aquí submit
+        falla, y lo que quede sin atender recibe BatcherClosedError en lugar de esperar para siempre.
+        """
+        with self._lock:
+            self._closed = True
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(_STOP)
+            else:
+                self._fail_pending()
+
+    def _fail_pending(self):
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not _STOP and entry[1].set_running_or_notify_cancel():
+                entry[1].set_exception(BatcherClosedError(f"MicroBatcher {self.name} cerrado"))
+
+    def _collect(self):
+        """Devuelve (lote, detener)"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if not batch:
+                break
+            now = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self.queue_wait_ms.observe((now - enqueued_at) * 1000)
+            # Las peticiones que dejaron de esperar (timeout) cancelaron su Future
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self.batch_sizes.observe(len(batch))
+
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+        self._fail_pending()
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize(),
+            "batch_size": self.batch_sizes.stats(),
+            "queue_wait_ms": self.queue_wait_ms.stats()
+        }
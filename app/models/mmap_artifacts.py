@@ -0,0 +1,134 @@
+"""
+    Artefactos de modelos en formatos que se pueden mapear en memoria (mmap).
+
+    Con mmap los pesos no se copian a la memoria privada de cada proceso: se leen
+    desde el page cache del sistema, así que la API, los workers de Celery y otras
+    réplicas del mismo host comparten una sola copia física y la carga es casi
+    instantánea cuando el archivo ya está en cache.
+
+    Convertir los artefactos de un modelo (una sola vez, junto a los originales):
+        python -m app.models.mmap_artifacts traditional patente Random_Forest_20250813_144340
+        python -m app.models.mmap_artifacts transformer ods distilbert_10e_24b_0
+
+    - Tradicionales: model.pkl / vectorizer.pkl se vuelven a guardar sin compresión
+      como *.mmap.joblib y se cargan con joblib mmap_mode="r". Solo se comparten los
+      arrays de numpy (coef_, idf_, ...); los diccionarios (vocabulary_) y los árboles
+      de RandomForest se siguen copiando al cargarse.
+    - Transformers: los pesos se guardan como model.safetensors y se cargan con
+      UntypedStorage.from_file (MAP_PRIVATE): los tensores apuntan directamente al
+      archivo y solo se copia una página si alguien la escribe.
+"""
+from transformers import AutoConfig, AutoModelForSequenceClassification
+from transformers.modeling_utils import no_init_weights
+import argparse
+import struct
+import joblib
+import json
+import os
+
+import torch
+
+SAFETENSORS_FILENAME = "model.safetensors"
+MMAP_SUFFIX = ".mmap.joblib"
+
+# Tipos de safetensors -> torch
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def mmap_joblib_path(pkl_path):
+    """model.pkl -> model.mmap.joblib"""
+    return os.path.splitext(pkl_path)[0] + MMAP_SUFFIX
+
+def load_joblib(pkl_path):
+    """
+    Carga la versión mapeable (*.mmap.joblib) si existe, si no el .pkl original.
+    returns: (objeto, ruta cargada)
+    """
+    path = mmap_joblib_path(pkl_path)
+    if os.path.exists(path):
+        return joblib.load(path, mmap_mode="r"), path
+    return joblib.load(pkl_path), pkl_path
+
+def safetensors_path(model_dir):
+    return os.path.join(model_dir, SAFETENSORS_FILENAME)
+
+def load_safetensors_mmap(path):
+    """
+    Lee un archivo safetensors como tensores que apuntan al archivo mapeado.
+    El formato es: 8 bytes con el tamaño del encabezado, encabezado JSON y los datos.
+    """
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    data_start = 8 + header_size
+    state_dict = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        offset = data_start + begin
+        itemsize = torch.empty(0, dtype=dtype).element_size()
+        if offset % itemsize == 0:
+            tensor = torch.empty(0, dtype=dtype).set_(storage, offset // itemsize, info["shape"])
+        else:
+            # Desalineado respecto al tipo: no se puede crear la vista, se copia
+            raw = torch.empty(0, dtype=torch.uint8).set_(storage, offset, (end - begin,))
+            tensor = raw.clone().view(dtype).reshape(info["shape"])
+        state_dict[name] = tensor
+    return state_dict
+
+def load_classifier_mmap(model_dir):
+    """
+    Construye el clasificador sin inicializar pesos y le asigna los tensores
+    mapeados (assign=True evita copiarlos a los parámetros ya creados).
+    """
+    config = AutoConfig.from_pretrained(model_dir)
+    with no_init_weights():
+        model = AutoModelForSequenceClassification.from_config(config)
+    missing, unexpected = model.load_state_dict(load_safetensors_mmap(safetensors_path(model_dir)), strict=False, assign=True)
+    model.tie_weights()
+    # Los buffers position_ids se crean en el constructor; cualquier otra diferencia
+    # (nombres antiguos, pesos ausentes) queda para from_pretrained, que sabe convertirlos
+    missing = [k for k in missing if not k.endswith("position_ids")]
+    if missing or unexpected:
+        raise ValueError(f"{SAFETENSORS_FILENAME} no coincide con la arquitectura (faltan {missing[:3]}, sobran {unexpected[:3]})")
+    model.eval()
+    return model
+
+
+def convert_traditional(model_dir):
+    """Guarda model/vectorizer/label_encoder sin compresión para cargarlos con mmap_mode"""
+    for name in ("model.pkl", "vectorizer.pkl", "label_encoder.pkl"):
+        pkl_path = os.path.join(model_dir, name)
+        if not os.path.exists(pkl_path):
+            continue
+        joblib.dump(joblib.load(pkl_path), mmap_joblib_path(pkl_path), compress=0)
+        print(f"   ✅ {os.path.basename(mmap_joblib_path(pkl_path))}")
+
+def convert_transformer(model_dir):
+    """Vuelve a guardar los pesos del clasificador como model.safetensors"""
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.save_pretrained(model_dir, safe_serialization=True)
+    print(f"   ✅ {SAFETENSORS_FILENAME}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte artefactos de modelos a formatos mapeables en memoria")
+    parser.add_argument("kind", choices=["traditional", "transformer"])
+    parser.add_argument("tipo", help="ods, patente o carrera")
+    parser.add_argument("model_folder")
+    args = parser.parse_args()
+
+    subdir = "traditional" if args.kind == "traditional" else "transformers"
+    model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), args.tipo, subdir, args.model_folder)
+    print(f"🗺️ Convirtiendo {model_dir}...")
+    if args.kind == "traditional":
+        convert_traditional(model_dir)
+    else:
+        convert_transformer(model_dir)
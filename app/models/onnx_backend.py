@@ -0,0 +1,191 @@
+"""
+    Backend de ONNX Runtime para los modelos transformer de clasificación.
+    onnxruntime es opcional: pip install -r requirements-onnx.txt
+
+    Exportar un modelo (una sola vez, deja model.onnx y onnx_parity.json junto al modelo):
+        python -m app.models.onnx_backend export ods distilbert_10e_24b_0
+
+    Comparar latencia y throughput de torch y ONNX Runtime:
+        python -m app.models.onnx_backend benchmark ods distilbert_10e_24b_0 --texts 64 --batch-size 16
+"""
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import numpy as np
+import argparse
+import inspect
+import time
+import json
+import os
+
+import torch
+
+from app.consts import ONNX_INTRA_OP_THREADS
+
+# onnxruntime es opcional: sin él, los modelos usan siempre torch
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+ONNX_FILENAME = "model.onnx"
+PARITY_FILENAME = "onnx_parity.json"
+
+# Textos para la verificación de paridad (longitudes distintas para probar el padding)
+PARITY_TEXTS = [
+    "sustainable development",
+    "food waste food insecurity global challenge study present novel approach optimize food bank network",
+    "method manage indoor beacon base communication content distribution indoor space surround area cover beacon signal system receive portable device",
+    "desarrollo prototipo sistema seguimiento contrato",
+]
+
+
+def onnx_available():
+    return ort is not None
+
+def onnx_path(model_dir):
+    return os.path.join(model_dir, ONNX_FILENAME)
+
+def onnx_ready(model_dir):
+    """
+    Indica si el modelo tiene un model.onnx que pasó la verificación de paridad.
+    returns: (bool, motivo)
+    """
+    if not onnx_available():
+        return False, "onnxruntime no está instalado"
+    if not os.path.exists(onnx_path(model_dir)):
+        return False, f"no existe {ONNX_FILENAME}"
+    try:
+        with open(os.path.join(model_dir, PARITY_FILENAME)) as f:
+            parity = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False, f"no existe {PARITY_FILENAME} válido"
+    if not parity.get("passed"):
+        return False, f"la paridad con torch falló (max_abs_diff={parity.get('max_abs_diff')})"
+    return True, "ok"
+
+
+class OnnxClassifier:
+    """Sesión de ONNX Runtime que devuelve los mismos logits que el modelo de torch"""
+
+    def __init__(self, path, intra_op_threads=ONNX_INTRA_OP_THREADS):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def logits(self, inputs):
+        """inputs: dict de arrays de numpy (salida del tokenizer con return_tensors='np')"""
+        feed = {name: np.asarray(inputs[name], dtype=np.int64) for name in self.input_names}
+        return self.session.run(["logits"], feed)[0]
+
+    def size_bytes(self):
+        return os.path.getsize(self.path)
+
+
+def export_onnx(model_dir, opset=17, atol=1e-4):
+    """
+    Exporta el modelo de model_dir a ONNX y compara sus logits con los de torch.
+    El resultado de la paridad se guarda en onnx_parity.json; el loader solo usa
+    el model.onnx si la paridad pasó.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer(PARITY_TEXTS, padding=True, truncation=True, max_length=512, return_tensors="pt")
+    # El exportador ordena las entradas del grafo según la firma de forward(), no según
+    # el tokenizer (BERT: input_ids, token_type_ids, attention_mask); se pasan en ese orden
+    forward_params = list(inspect.signature(model.forward).parameters)
+    input_names = [name for name in forward_params if name in sample]
+    forward_args = tuple(sample[name] for name in input_names)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    path = onnx_path(model_dir)
+    print(f"📤 Exportando {model_dir} a ONNX...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            forward_args,
+            path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+        torch_logits = model(**sample).logits.numpy()
+
+    onnx_logits = OnnxClassifier(path).logits({k: v.numpy() for k, v in sample.items()})
+    max_abs_diff = float(np.max(np.abs(torch_logits - onnx_logits)))
+    parity = {
+        "passed": max_abs_diff <= atol,
+        "max_abs_diff": max_abs_diff,
+        "atol": atol,
+        "same_argmax": bool((torch_logits.argmax(-1) == onnx_logits.argmax(-1)).all()),
+        "opset": opset
+    }
+    with open(os.path.join(model_dir, PARITY_FILENAME), "w") as f:
+        json.dump(parity, f, indent=2)
+
+    print(f"   {'✅' if parity['passed'] else '❌'} Paridad con torch: max_abs_diff={max_abs_diff:.2e} (atol={atol})")
+    return parity
+
+
+def _synthetic_texts(n):
+    base = " ".join(PARITY_TEXTS).split()
+    # Longitudes variadas: de 8 palabras hasta ~400
+    return [" ".join((base * 20)[: 8 + (i * 37) % 400]) for i in range(n)]
+
+def benchmark_backends(tipo, model_folder, n_texts=64, batch_size=16, repeats=3):
+    """Mide latencia por lote y throughput de cada backend disponible para el modelo"""
+    from app.models.ModelLoader import ModelLoader
+
+    texts = _synthetic_texts(n_texts)
+    resultados = {}
+    for backend in ("torch", "onnx"):
+        loader = ModelLoader(tipo=tipo)
+        model_data = loader.load_transformer_model(model_folder, device="cpu", backend=backend)
+        if model_data["backend"] != backend:
+            print(f"⚠️ Backend {backend} no disponible para {model_folder}, se omite")
+            continue
+
+        loader._forward_transformer(model_data, texts[:batch_size], batch_size) # calentamiento
+        latencias = []
+        inicio = time.perf_counter()
+        for _ in range(repeats):
+            for i in range(0, n_texts, batch_size):
+                t0 = time.perf_counter()
+                loader._forward_transformer(model_data, texts[i:i+batch_size], batch_size)
+                latencias.append((time.perf_counter() - t0) * 1000)
+        total = time.perf_counter() - inicio
+
+        resultados[backend] = {
+            "latency_ms_p50": round(float(np.percentile(latencias, 50)), 2),
+            "latency_ms_p95": round(float(np.percentile(latencias, 95)), 2),
+            "throughput_texts_s": round(n_texts * repeats / total, 2),
+            "size_mb": round(loader.loaded_models.total_bytes() / 1e6, 1)
+        }
+        print(f"   {backend}: {resultados[backend]}")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportación y benchmark del backend ONNX Runtime")
+    parser.add_argument("action", choices=["export", "benchmark"])
+    parser.add_argument("tipo", help="ods, patente o carrera")
+    parser.add_argument("model_folder")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--texts", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.action == "export":
+        model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), args.tipo, "transformers", args.model_folder)
+        print(json.dumps(export_onnx(model_dir, opset=args.opset, atol=args.atol), indent=2))
+    else:
+        print(json.dumps(benchmark_backends(args.tipo, args.model_folder, args.texts, args.batch_size, args.repeats), indent=2))
@@ -0,0 +1,170 @@
+"""
+    Cuantización dinámica int8 de los modelos transformer (clasificadores y MarianMT).
+
+    Genera quantized_int8.pt (state_dict cuantizado) y quantization.json (tamaños y
+    diferencia de exactitud sobre una muestra) junto al modelo original:
+        python -m app.models.quantization classifier ods distilbert_10e_24b_0 --sample muestra.jsonl
+        python -m app.models.quantization translator es_en --sample muestra.jsonl
+
+    La muestra es un JSONL con {"text": ..., "label": ...}; label es el índice de clase
+    que devuelve el modelo y es opcional (sin label se mide el acuerdo con fp32).
+    Los traductores cuantizados se guardan en app/models/traduccion/<direccion>/.
+
+    El loader usa el artefacto int8 según TRANSFORMER_PRECISION / TRANSLATION_PRECISION.
+"""
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer, MarianMTModel, MarianTokenizer
+import argparse
+import json
+import os
+
+import torch
+
+QUANTIZED_FILENAME = "quantized_int8.pt"
+REPORT_FILENAME = "quantization.json"
+
+# Directorio de los traductores cuantizados (los originales vienen del hub de Hugging Face)
+TRANSLATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traduccion")
+
+
+def quantize_dynamic_int8(model):
+    """Cuantiza a int8 las capas lineales (pesos int8, activaciones cuantizadas al vuelo)"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def quantized_path(model_dir):
+    return os.path.join(model_dir, QUANTIZED_FILENAME)
+
+def translation_dir(direccion):
+    return os.path.join(TRANSLATION_DIR, direccion)
+
+def load_quantized(model_dir, config_source, model_class):
+    """
+    Construye la arquitectura desde la configuración (sin leer los pesos fp32),
+    la cuantiza y carga el state_dict int8 guardado en model_dir.
+    config_source: carpeta o checkpoint del que se lee la configuración
+    """
+    config = AutoConfig.from_pretrained(config_source)
+    # Las clases Auto* se construyen con from_config; las concretas (MarianMTModel) con el constructor
+    model = model_class.from_config(config) if hasattr(model_class, "from_config") else model_class(config)
+    model = quantize_dynamic_int8(model)
+    # Artefacto propio: los parámetros empaquetados int8 no pasan por weights_only
+    model.load_state_dict(torch.load(quantized_path(model_dir), map_location="cpu", weights_only=False))
+    model.eval()
+    return model
+
+def _save_report(model_dir, report):
+    with open(os.path.join(model_dir, REPORT_FILENAME), "w") as f:
+        json.dump(report, f, indent=2)
+
+def _read_sample(path):
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                texts.append(row["text"])
+                labels.append(row.get("label"))
+    return texts, labels if all(label is not None for label in labels) else None
+
+
+def quantize_classifier(tipo, model_folder, texts=None, labels=None, preprocessed=False):
+    """Cuantiza un clasificador de models/<tipo>/transformers/<model_folder> y mide la diferencia con fp32"""
+    from app.models.ModelLoader import ModelLoader, crear_corpus_batch, torch_model_size_bytes
+
+    loader = ModelLoader(tipo=tipo)
+    model_dir = f"{loader.models_dir}/transformers/{model_folder}"
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    print(f"🗜️ Cuantizando clasificador {model_folder} a int8...")
+    qmodel = quantize_dynamic_int8(model)
+    torch.save(qmodel.state_dict(), quantized_path(model_dir))
+
+    report = {
+        "size_fp32_bytes": torch_model_size_bytes(model),
+        "size_int8_bytes": os.path.getsize(quantized_path(model_dir)),
+    }
+    if texts:
+        if not preprocessed:
+            texts = crear_corpus_batch(texts)
+        fp32 = {'model': model, 'tokenizer': tokenizer, 'device': "cpu", 'backend': "torch"}
+        int8 = {'model': qmodel, 'tokenizer': tokenizer, 'device': "cpu", 'backend': "torch"}
+        preds_fp32, _ = loader._forward_transformer(fp32, texts)
+        preds_int8, _ = loader._forward_transformer(int8, texts)
+
+        report["sample_size"] = len(texts)
+        report["agreement"] = round(sum(a == b for a, b in zip(preds_fp32, preds_int8)) / len(texts), 4)
+        if labels is not None:
+            acc_fp32 = sum(p == y for p, y in zip(preds_fp32, labels)) / len(labels)
+            acc_int8 = sum(p == y for p, y in zip(preds_int8, labels)) / len(labels)
+            report["accuracy_fp32"] = round(acc_fp32, 4)
+            report["accuracy_int8"] = round(acc_int8, 4)
+            report["accuracy_delta"] = round(acc_int8 - acc_fp32, 4)
+
+    _save_report(model_dir, report)
+    print(f"   ✅ {json.dumps(report)}")
+    return report
+
+def quantize_translator(direccion, texts=None):
+    """Cuantiza el modelo MarianMT de la dirección ("es_en" o "en_es") y mide el acuerdo con fp32"""
+    from app.models.ModelLoader import translation_checkpoints, torch_model_size_bytes
+
+    checkpoint = translation_checkpoints[direccion]
+    model_dir = translation_dir(direccion)
+    os.makedirs(model_dir, exist_ok=True)
+
+    tokenizer = MarianTokenizer.from_pretrained(checkpoint)
+    model = MarianMTModel.from_pretrained(checkpoint)
+    model.eval()
+
+    print(f"🗜️ Cuantizando traductor {checkpoint} a int8...")
+    qmodel = quantize_dynamic_int8(model)
+    torch.save(qmodel.state_dict(), quantized_path(model_dir))
+
+    report = {
+        "checkpoint": checkpoint,
+        "size_fp32_bytes": torch_model_size_bytes(model),
+        "size_int8_bytes": os.path.getsize(quantized_path(model_dir)),
+    }
+    if texts:
+        outputs = {}
+        for name, m in (("fp32", model), ("int8", qmodel)):
+            inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+            with torch.no_grad():
+                outputs[name] = tokenizer.batch_decode(m.generate(**inputs), skip_special_tokens=True)
+
+        overlaps = []
+        for a, b in zip(outputs["fp32"], outputs["int8"]):
+            tokens_a, tokens_b = set(a.lower().split()), set(b.lower().split())
+            overlaps.append(len(tokens_a & tokens_b) / len(tokens_a | tokens_b) if tokens_a | tokens_b else 1.0)
+
+        report["sample_size"] = len(texts)
+        report["exact_match"] = round(sum(a == b for a, b in zip(outputs["fp32"], outputs["int8"])) / len(texts), 4)
+        report["token_overlap"] = round(sum(overlaps) / len(overlaps), 4)
+
+    _save_report(model_dir, report)
+    print(f"   ✅ {json.dumps(report)}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cuantización dinámica int8 de modelos transformer")
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+
+    classifier = subparsers.add_parser("classifier")
+    classifier.add_argument("tipo", help="ods, patente o carrera")
+    classifier.add_argument("model_folder")
+    classifier.add_argument("--sample", help="JSONL con la muestra de evaluación")
+    classifier.add_argument("--preprocessed", action="store_true", help="la muestra ya está lematizada")
+
+    translator = subparsers.add_parser("translator")
+    translator.add_argument("direccion", choices=["es_en", "en_es"])
+    translator.add_argument("--sample", help="JSONL con la muestra de evaluación")
+
+    args = parser.parse_args()
+    texts, labels = _read_sample(args.sample) if args.sample else (None, None)
+
+    if args.kind == "classifier":
+        quantize_classifier(args.tipo, args.model_folder, texts, labels, preprocessed=args.preprocessed)
+    else:
+        quantize_translator(args.direccion, texts)
@@ -0,0 +1,76 @@
+import threading
+import time
+import os
+
+
+class ModelIndex:
+    """
+    Índice en memoria de los modelos de models/<tipo>/{traditional,transformers}/<nombre>.
+    Se escanea una vez al crear el ModelLoader y con refresh(); las consultas por
+    nombre no tocan el disco.
+    """
+
+    # Tipo de modelo -> subcarpeta (en orden de prioridad si un nombre está en ambas)
+    TYPE_DIRS = {"traditional": "traditional", "transformer": "transformers"}
+
+    def __init__(self, models_dir, tipo):
+        self.models_dir = models_dir
+        self.tipo = tipo
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.scanned_at = None
+        self.refresh()
+
+    def _scan_model(self, name, model_type, path):
+        artifacts = {}
+        mtime = os.path.getmtime(path)
+        for root, _, files in os.walk(path):
+            for file in files:
+                file_path = os.path.join(root, file)
+                stat = os.stat(file_path)
+                artifacts[os.path.relpath(file_path, path)] = stat.st_size
+                mtime = max(mtime, stat.st_mtime)
+        return {
+            "name": name,
+            "tipo": self.tipo,
+            "type": model_type,
+            "path": path,
+            "artifacts": artifacts,
+            "size_bytes": sum(artifacts.values()),
+            "mtime": mtime
+        }
+
+    def refresh(self):
+        """Vuelve a escanear el directorio de modelos; devuelve cuántos modelos encontró"""
+        entries = {}
+        for model_type, subdir in self.TYPE_DIRS.items():
+            base = os.path.join(self.models_dir, subdir)
+            if not os.path.isdir(base):
+                continue
+            for name in sorted(os.listdir(base)):
+                path = os.path.join(base, name)
+                if not os.path.isdir(path):
+                    continue
+                if name in entries:
+                    print(f"[DIAGNÓSTICO WARN] Modelo {name} duplicado en {self.tipo}, se usa el {entries[name]['type']}")
+                    continue
+                entries[name] = self._scan_model(name, model_type, path)
+
+        with self._lock:
+            self._entries = entries
+            self.scanned_at = time.time()
+        print(f"🗂️ Índice de modelos {self.tipo}: {len(entries)} modelos")
+        return len(entries)
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def model_type(self, name):
+        entry = self._entries.get(name)
+        return entry["type"] if entry is not None else None
+
+    def list(self):
+        return list(self._entries.values())
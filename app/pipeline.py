@@ -0,0 +1,190 @@
+from contextlib import ExitStack
+import threading
+import time
+
+import numpy as np
+
+from app.metrics import Histogram
+from app.validations import validate_model
+from app.models.ModelLoader import crear_corpus_batch, traducir_por_idioma
+
+# =================================================================
+# --- PIPELINE DE CLASIFICACIÓN POR ETAPAS ---
+# =================================================================
+# Cada proyecto (ods, patente, carrera) es una lista de etapas que reciben y modifican
+# el mismo contexto (dict) con un lote completo de textos:
+#   raw_texts -> texts (lematizados/traducidos) -> predictions/probabilities -> outputs
+# Hasta el postproceso los resultados son arrays de numpy de todo el lote (probabilidades
+# en float32); se convierten a objetos de Python una sola vez, al armar los outputs.
+# Las etapas marcadas como preprocesamiento se omiten cuando el llamador ya trae los
+# textos preparados (endpoint /fusion). Cada etapa se mide y se puede observar con hooks.
+# El modelo queda en uso (use_model) desde que se resuelve el alias hasta el final, así un
+# cambio de alias durante el preprocesamiento espera a esta petición antes de liberarlo.
+
+STAGE_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_stage_hooks = []
+
+def add_stage_hook(hook):
+    """
+    Registra hook(tipo, etapa, segundos, n_textos), llamado al terminar cada etapa
+    de cualquier pipeline. Un hook que falla no interrumpe la predicción.
+    """
+    _stage_hooks.append(hook)
+
+
+class Stage:
+    """
+    name: nombre de la etapa (aparece en /stats)
+    fn: fn(ctx) modifica el contexto en sitio
+    preprocessing: se omite si los textos ya vienen preparados
+    """
+
+    def __init__(self, name, fn, preprocessing=False):
+        self.name = name
+        self.fn = fn
+        self.preprocessing = preprocessing
+
+
+class Pipeline:
+
+    def __init__(self, tipo, stages):
+        self.tipo = tipo
+        self.stages = stages
+        self._timings = {stage.name: Histogram(STAGE_BUCKETS_MS) for stage in stages}
+        self._lock = threading.Lock()
+        self.runs = 0
+
+    def run(self, loader, model_folder, raw_texts, model_type='auto', texts=None):
+        """
+        Ejecuta las etapas sobre el lote raw_texts.
+        texts: textos ya lematizados y traducidos, se omiten las etapas de preprocesamiento
+        returns: el contexto con texts, predictions, probabilities, labels, top_indices y outputs
+        """
+        ctx = {
+            "tipo": self.tipo,
+            "loader": loader,
+            "model_folder": model_folder,
+            "model_type": model_type,
+            "raw_texts": list(raw_texts),
+            "texts": list(texts) if texts is not None else list(raw_texts),
+        }
+        with ExitStack() as uso:
+            ctx["uso"] = uso # referencias que se sueltan al terminar el pipeline
+            for stage in self.stages:
+                if texts is not None and stage.preprocessing:
+                    continue
+                inicio = time.perf_counter()
+                stage.fn(ctx)
+                self._observe(stage.name, time.perf_counter() - inicio, len(ctx["raw_texts"]))
+        with self._lock:
+            self.runs += 1
+        return ctx
+
+    def _observe(self, name, seconds, n_texts):
+        self._timings[name].observe(seconds * 1000)
+        for hook in _stage_hooks:
+            try:
+                hook(self.tipo, name, seconds, n_texts)
+            except Exception as e:
+                print(f"[DIAGNÓSTICO WARN] Falló el hook de la etapa {name}: {e}")
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "stages_ms": {name: histogram.stats() for name, histogram in self._timings.items()},
+        }
+
+
+# --- Etapas reutilizables ---
+
+def resolve_model():
+    """
+    Resuelve el alias (p. ej. "default") y el tipo de modelo desde el índice en memoria
+    y marca el modelo en uso hasta el final del pipeline
+    """
+    def fn(ctx):
+        ctx["model_folder"] = ctx["loader"].resolve_alias(ctx["model_folder"])
+        ctx["model_type"] = validate_model(ctx["loader"], ctx["model_folder"], ctx["model_type"])
+        ctx["uso"].enter_context(ctx["loader"].use_model(ctx["model_folder"]))
+    return Stage("modelo", fn)
+
+def normalize():
+    """Lematiza y limpia (infer le pasa estos textos al loader como preprocesados)"""
+    def fn(ctx):
+        ctx["texts"] = crear_corpus_batch(ctx["texts"])
+    return Stage("normalizacion", fn, preprocessing=True)
+
+def route_language(idioma_origen, direccion):
+    """Traduce al idioma del modelo solo los textos detectados en idioma_origen y lematiza las traducciones"""
+    def fn(ctx):
+        ctx["texts"] = traducir_por_idioma(ctx["texts"], idioma_origen, direccion, lematizar=True)
+    return Stage(f"idioma_{direccion}", fn, preprocessing=True)
+
+def infer(label_offset=0):
+    """
+    Vectorización/tokenización e inferencia con el loader (que mantiene el modelo en uso
+    durante toda la llamada y junta textos de otras peticiones en el micro-batcher).
+    Los textos ya vienen lematizados (normalize y route_language, o el llamador).
+    label_offset: se resta a las predicciones de modelos tradicionales que se entrenaron
+    con etiquetas desde 1 (ODS), para que todas queden como índices de probabilities
+    """
+    def fn(ctx):
+        loader = ctx["loader"]
+        if ctx["model_type"] == 'traditional':
+            result = loader.predict_traditional(ctx["model_folder"], ctx["texts"], preprocessed=True)
+        else:
+            result = loader.predict_transformer(ctx["model_folder"], ctx["texts"], preprocessed=True)
+        predictions, probabilities = np.asarray(result[0]), result[1]
+        ctx["labels"] = result[2] if len(result) > 2 else None
+        if ctx["model_type"] == 'traditional' and label_offset:
+            predictions = predictions - label_offset
+        ctx["predictions"] = predictions
+        ctx["probabilities"] = probabilities
+    return Stage("inferencia", fn)
+
+def top_k_matrix(probabilities, k):
+    """
+    Top k de cada fila de la matriz en una sola llamada: argpartition separa las k
+    mayores (sin ordenar toda la fila) y solo esas k se ordenan de mayor a menor.
+    returns: (índices, probabilidades), ambos de forma (textos x k)
+    """
+    k = min(k, probabilities.shape[1])
+    if k == 0:
+        empty = np.empty((probabilities.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(probabilities.dtype)
+    indices = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    top_probs = np.take_along_axis(probabilities, indices, axis=1)
+    order = np.argsort(-top_probs, axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(top_probs, order, axis=1)
+
+def top_k(k=3):
+    """Índices y probabilidades de las k clases más probables de cada texto, de mayor a menor"""
+    def fn(ctx):
+        ctx["top_indices"], ctx["top_probs"] = None, None
+        if ctx["probabilities"] is not None:
+            ctx["top_indices"], ctx["top_probs"] = top_k_matrix(ctx["probabilities"], k)
+    return Stage("top_k", fn)
+
+def to_python(ctx):
+    """Convierte los arrays del lote a listas de Python (una llamada tolist por array)"""
+    return {
+        name: value.tolist() if isinstance(value, np.ndarray) else value
+        for name, value in ctx.items()
+        if name in ("predictions", "probabilities", "top_indices", "top_probs", "labels")
+    }
+
+def postprocess(format_fn):
+    """
+    format_fn(py, i) -> dict de salida del texto i (mismo formato que /batch)
+    py: resultados del lote ya convertidos a listas de Python (ctx["py"])
+    """
+    def fn(ctx):
+        py = ctx["py"] = to_python(ctx)
+        ctx["outputs"] = [format_fn(py, i) for i in range(len(py["predictions"]))]
+        print(f"\n📋 Resultados ({len(ctx['outputs'])} textos):")
+        for i, (text, output) in enumerate(zip(ctx["texts"][:3], ctx["outputs"][:3])): # en lotes solo los primeros
+            prob_str = f" (confianza: {output['probability']:.3f})" if output.get("probability") is not None else ""
+            print(f"   {i+1}. Texto: '{text[:75]}...'")
+            print(f"      Predicción: {output['prediction']}{prob_str}")
+    return Stage("postproceso", fn)
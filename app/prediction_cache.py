@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from app.concurrency import run_inference, AsyncSingleFlight
+from app.consts import PREDICTION_CACHE_MAXSIZE, PREDICTION_CACHE_TTL, PREDICTION_CACHE_REDIS
+from app.models.cache import TieredCache, hash_texto
+from app.models.ModelLoader import normalizar_texto
+from app.validations import clean_text
+
+# =================================================================
+# --- CACHE DE RESULTADOS DE PREDICCIÓN ---
+# =================================================================
+# Clave: tipo, versión del modelo en memoria (model_folder resuelto + fecha de los
+# artefactos que se cargaron + backend/precisión) y hash del texto normalizado. Cambiar
+# el modelo de un alias o recargar uno reentrenado cambia la clave, así que las entradas
+# anteriores dejan de usarse solas. Mientras el modelo no esté cargado no se usa el cache.
+
+prediction_cache = TieredCache(
+    "prediccion:",
+    maxsize=PREDICTION_CACHE_MAXSIZE,
+    ttl=PREDICTION_CACHE_TTL,
+    use_redis=PREDICTION_CACHE_REDIS
+)
+
+# Peticiones idénticas concurrentes (misma clave) comparten una sola ejecución
+prediction_flight = AsyncSingleFlight()
+
+def model_version(loader, model_folder):
+    model_data = loader.loaded_models.get(model_folder)
+    return f"{model_folder}@{model_data['version']}" if model_data is not None else None
+
+def prediction_key(tipo, loader, model_folder, text):
+    version = model_version(loader, model_folder)
+    if version is None:
+        return None
+    return f"{tipo}:{version}:{hash_texto(normalizar_texto(text))}"
+
+async def predict_cached(tipo, loader, model_name, text, predict_fn, uncached=()):
+    """
+    Devuelve el resultado de predict_fn(loader, model_folder, text) desde el cache
+    o lo calcula en el ejecutor de inferencia. Si otra petición idéntica ya lo está
+    calculando, se espera ese resultado en lugar de repetir la predicción.
+    uncached: posiciones del resultado que salen del modelo y no del texto (p. ej. la
+    lista de clases de carrera); se devuelven como None y no se guardan
+    returns: (resultado, "HIT" | "MISS" | "COALESCED")
+    """
+    # Se resuelve el alias una sola vez: la clave y la predicción usan el mismo modelo,
+    # que queda en uso desde aquí (incluida la espera en el ejecutor) para que un cambio
+    # de alias no lo libere antes de que esta petición lo use
+    model_folder = loader.resolve_alias(model_name)
+    with loader.use_model(model_folder):
+        return await _predict_cached(tipo, loader, model_folder, text, predict_fn, uncached)
+
+async def _predict_cached(tipo, loader, model_folder, text, predict_fn, uncached):
+    key = prediction_key(tipo, loader, model_folder, text)
+
+    if key is None:
+        # Modelo sin cargar (o fuera del índice: predict_fn responde el 404)
+        result = await run_inference(predict_fn, loader, model_folder, text)
+        return _without(result, uncached), "MISS"
+
+    cached = await asyncio.to_thread(prediction_cache.get, key)
+    if cached is not None:
+        return cached, "HIT"
+
+    result, shared = await prediction_flight.do(key, run_inference, predict_fn, loader, model_folder, text)
+    result = _without(result, uncached)
+    if shared:
+        return result, "COALESCED"
+    try:
+        await asyncio.to_thread(prediction_cache.set, key, result)
+    except (TypeError, ValueError) as e:
+        # Un resultado con tipos de numpy no se puede guardar como JSON; se responde igual
+        print(f"[DIAGNÓSTICO WARN] No se pudo guardar la predicción en cache: {e}")
+    return result, "MISS"
+
+def _without(result, uncached):
+    return [None if i in uncached else value for i, value in enumerate(result)]
+
+async def predict_batch_coalesced(tipo, loader, model_name, items, predict_batch_fn):
+    """
+    Ejecuta predict_batch_fn en el ejecutor de inferencia; un lote idéntico (mismo
+    modelo, mismos ids y mismos textos tras clean_text, que es lo que valida y predice
+    la función de lote) que llega mientras otro se procesa espera ese resultado.
+    returns: (resultado, "MISS" | "COALESCED")
+    """
+    model_folder = loader.resolve_alias(model_name)
+    payload = json.dumps([[item.id, clean_text(item.content)] for item in items])
+    key = f"{tipo}:batch:{model_folder}:{hash_texto(payload)}"
+    with loader.use_model(model_folder):
+        result, shared = await prediction_flight.do(key, run_inference, predict_batch_fn, loader, model_folder, items)
+    return result, "COALESCED" if shared else "MISS"
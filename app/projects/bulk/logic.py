@@ -0,0 +1,242 @@
+from fastapi import HTTPException
+import shutil
+import redis
+import uuid
+import json
+import csv
+import io
+import os
+
+# --- Importaciones de tu proyecto ---
+from app.consts import REDIS_HOST, REDIS_PORT, REDIS_STORE_DB_INDEX, BULK_JOBS_DIR, BULK_CHUNK_SIZE, BULK_JOB_TTL, stages
+from app.entities import BatchItem
+
+# =================================================================
+# --- CLASIFICACIÓN DE ARCHIVOS MASIVOS ---
+# =================================================================
+# El archivo subido se divide en chunks de BULK_CHUNK_SIZE filas (chunk_00000.in.jsonl)
+# y cada chunk es una tarea de Celery que escribe su chunk_00000.out.jsonl. El estado
+# del trabajo vive en Redis (bulk:<job_id>) y el progreso se publica en task_results
+# con task_id = job_id. Ni la API ni los workers tienen más de un chunk en memoria.
+# Los chunks terminados se registran por índice en un set (bulk:<job_id>:chunks), así
+# una tarea reentregada no se cuenta dos veces; los que no pudieron escribir sus
+# resultados quedan además en bulk:<job_id>:failed y el trabajo termina en FAILURE.
+
+_redis_client = None
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_STORE_DB_INDEX, decode_responses=True)
+    return _redis_client
+
+def get_bulk_predictor(tipo):
+    """
+    Loader y función de lote de cada tipo. Se importan al usarse para que un worker
+    solo cargue los modelos de los tipos que realmente procesa.
+    """
+    if tipo == "ods":
+        from app.projects.ods.router import loader_ods
+        from app.projects.ods.logic import predict_ods_batch
+        return loader_ods, predict_ods_batch
+    if tipo == "patente":
+        from app.projects.patente.router import loader_patente
+        from app.projects.patente.logic import predict_patent_batch
+        return loader_patente, predict_patent_batch
+    if tipo == "carrera":
+        from app.projects.carrera.router import loader_carrera
+        from app.projects.carrera.logic import predict_carrera_batch
+        return loader_carrera, predict_carrera_batch
+    raise HTTPException(status_code=404, detail=f"Tipo de modelo {tipo} no encontrado.")
+
+
+def job_key(job_id):
+    return f"bulk:{job_id}"
+
+def chunks_key(job_id):
+    return f"bulk:{job_id}:chunks"
+
+def failed_key(job_id):
+    return f"bulk:{job_id}:failed"
+
+def job_dir(job_id):
+    return os.path.join(BULK_JOBS_DIR, job_id)
+
+def chunk_path(job_id, index, kind):
+    """kind: "in" (filas a clasificar) u "out" (resultados)"""
+    return os.path.join(job_dir(job_id), f"chunk_{index:05d}.{kind}.jsonl")
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def _iter_rows(fileobj, filename, text_column, id_column):
+    """Recorre las filas del archivo sin leerlo completo; devuelve (id, texto)"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if extension == ".csv":
+        reader = csv.DictReader(stream)
+        if text_column not in (reader.fieldnames or []):
+            raise HTTPException(status_code=422, detail=f"El CSV no tiene la columna '{text_column}'.")
+        rows = reader
+    elif extension in (".jsonl", ".ndjson"):
+        rows = (json.loads(line) for line in stream if line.strip())
+    else:
+        raise HTTPException(status_code=422, detail="Formato no soportado, use .csv o .jsonl")
+
+    for number, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise HTTPException(status_code=400, detail=f"La fila {number + 1} no es un objeto JSON.")
+        row_id = row.get(id_column)
+        yield str(row_id if row_id not in (None, "") else number), _as_text(row.get(text_column))
+
+def _as_text(value):
+    """El contenido se guarda como texto (o None) para que el chunk siempre se pueda leer como BatchItem"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value)
+
+def split_upload(job_id, fileobj, filename, text_column="content", id_column="id", chunk_size=BULK_CHUNK_SIZE):
+    """
+    Escribe el archivo subido como chunks JSONL de chunk_size filas.
+    returns: (total_rows, total_chunks)
+    """
+    os.makedirs(job_dir(job_id), exist_ok=True)
+    total_rows = 0
+    total_chunks = 0
+    out = None
+    try:
+        for row_id, text in _iter_rows(fileobj, filename, text_column, id_column):
+            if total_rows % chunk_size == 0:
+                if out is not None:
+                    out.close()
+                out = open(chunk_path(job_id, total_chunks, "in"), "w", encoding="utf-8")
+                total_chunks += 1
+            out.write(json.dumps({"id": row_id, "content": text}, ensure_ascii=False) + "\n")
+            total_rows += 1
+    except HTTPException:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+        raise
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error) as e:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+        raise HTTPException(status_code=422, detail=f"No se pudo leer el archivo: {e}")
+    finally:
+        if out is not None:
+            out.close()
+
+    if total_rows == 0:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+        raise HTTPException(status_code=422, detail="El archivo no tiene filas.")
+    return total_rows, total_chunks
+
+def read_chunk(job_id, index):
+    with open(chunk_path(job_id, index, "in"), encoding="utf-8") as f:
+        return [BatchItem(**json.loads(line)) for line in f]
+
+def read_chunk_ids(job_id, index):
+    """Solo los ids del chunk (para marcar todas sus filas con error si no se pudo leer)"""
+    with open(chunk_path(job_id, index, "in"), encoding="utf-8") as f:
+        return [json.loads(line).get("id") for line in f]
+
+def write_chunk_results(job_id, index, results):
+    """Escribe los resultados del chunk (primero a un temporal para no dejar archivos a medias)"""
+    path = chunk_path(job_id, index, "out")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def create_job(job_id, tipo, model_name, total_rows, total_chunks):
+    state = {
+        "job_id": job_id,
+        "tipo": tipo,
+        "model_name": model_name,
+        "status": stages[0],
+        "total_rows": total_rows,
+        "total_chunks": total_chunks,
+        "done_chunks": 0,
+        "failed_chunks": 0,
+        "done_rows": 0,
+        "errors": 0
+    }
+    client = get_redis()
+    client.hset(job_key(job_id), mapping=state)
+    client.expire(job_key(job_id), BULK_JOB_TTL)
+    return state
+
+def get_job(job_id):
+    state = get_redis().hgetall(job_key(job_id))
+    if not state:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado.")
+    for field in ("total_rows", "total_chunks", "done_chunks", "failed_chunks", "done_rows", "errors"):
+        state[field] = int(state.get(field, 0))
+    return state
+
+def _record_chunk(job_id, index, rows, errors):
+    """Registra el chunk una sola vez; returns: True si es la primera vez"""
+    client = get_redis()
+    if not client.sadd(chunks_key(job_id), index):
+        return False
+    pipe = client.pipeline(transaction=True)
+    pipe.expire(chunks_key(job_id), BULK_JOB_TTL)
+    pipe.hincrby(job_key(job_id), "done_rows", rows)
+    pipe.hincrby(job_key(job_id), "errors", errors)
+    pipe.execute()
+    return True
+
+def _update_status(job_id):
+    """Recalcula los chunks terminados y cierra el trabajo cuando están todos"""
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.scard(chunks_key(job_id))
+    pipe.scard(failed_key(job_id))
+    pipe.hget(job_key(job_id), "total_chunks")
+    done_chunks, failed_chunks, total_chunks = pipe.execute()
+    if total_chunks is None:
+        # El trabajo se borró mientras se procesaba el chunk
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado.")
+    updates = {"done_chunks": done_chunks, "failed_chunks": failed_chunks}
+    if done_chunks >= int(total_chunks):
+        updates["status"] = stages[2] if failed_chunks else stages[1]
+    get_redis().hset(job_key(job_id), mapping=updates)
+    return get_job(job_id)
+
+def mark_chunk_done(job_id, index, rows, errors):
+    """Marca el chunk como terminado (una tarea reentregada no lo cuenta otra vez)"""
+    if not _record_chunk(job_id, index, rows, errors):
+        # Reentrega: si la vez anterior falló la escritura, ahora sí hay resultados
+        get_redis().srem(failed_key(job_id), index)
+    return _update_status(job_id)
+
+def mark_chunk_failed(job_id, index, rows):
+    """Marca el chunk como terminado sin resultados: todas sus filas cuentan como error"""
+    client = get_redis()
+    if client.sismember(chunks_key(job_id), index) and not client.sismember(failed_key(job_id), index):
+        # Ya tenía resultados de una entrega anterior (se escriben de forma atómica)
+        return _update_status(job_id)
+    client.sadd(failed_key(job_id), index)
+    client.expire(failed_key(job_id), BULK_JOB_TTL)
+    _record_chunk(job_id, index, rows, rows)
+    return _update_status(job_id)
+
+def delete_job(job_id):
+    get_redis().delete(job_key(job_id), chunks_key(job_id), failed_key(job_id))
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+def iter_results(job_id, total_chunks):
+    """
+    Concatena los resultados de los chunks en orden, de a un chunk por vez.
+    Un chunk sin resultados se informa con una línea de error en su lugar.
+    """
+    for index in range(total_chunks):
+        try:
+            f = open(chunk_path(job_id, index, "out"), "rb")
+        except FileNotFoundError:
+            yield (json.dumps({"chunk": index, "error": "Resultados del chunk no disponibles."}, ensure_ascii=False) + "\n").encode("utf-8")
+            continue
+        with f:
+            while True:
+                block = f.read(64 * 1024)
+                if not block:
+                    break
+                yield block
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, File, Form, UploadFile
+from fastapi.responses import StreamingResponse
+from fastapi import HTTPException
+
+# Importamos la tarea de Celery
+from app.celery.tasks import run_bulk_chunk_task
+
+# --- Importaciones de tu proyecto ---
+from app.consts import stages
+from app.entities import BulkJobResponse
+from app.validations import validate_model, validate_not_empty
+from .logic import get_bulk_predictor, new_job_id, split_upload, create_job, get_job, delete_job, iter_results
+
+bulk_router = APIRouter()
+
+@bulk_router.post("/{tipo}", response_model=BulkJobResponse, status_code=202)
+def upload_bulk_file(
+    tipo: str,
+    file: UploadFile = File(...),
+    model_name: str = Form("default"),
+    text_column: str = Form("content"),
+    id_column: str = Form("id"),
+):
+    """
+    Clasifica un archivo CSV o JSONL (una fila por texto) en segundo plano.
+    El archivo se divide en chunks y cada chunk es una tarea de Celery; el progreso
+    se consulta en GET /predict/bulk/{job_id} o por WebSocket suscribiéndose al job_id.
+    """
+    loader, _ = get_bulk_predictor(tipo)
+    model_name = model_name.strip()
+    validate_not_empty(model_name)
+    # Se resuelve el alias ahora para que todos los chunks usen el mismo modelo
+    model_folder = loader.resolve_alias(model_name)
+    validate_model(loader, model_folder)
+
+    job_id = new_job_id()
+    total_rows, total_chunks = split_upload(job_id, file.file, file.filename, text_column, id_column)
+    state = create_job(job_id, tipo, model_folder, total_rows, total_chunks)
+
+    for index in range(total_chunks):
+        run_bulk_chunk_task.delay(job_id, tipo, model_folder, index)
+
+    print(f"[DIAGNÓSTICO] Trabajo {job_id}: {total_rows} filas en {total_chunks} chunks ({tipo}/{model_folder})")
+    return state
+
+@bulk_router.get("/{job_id}", response_model=BulkJobResponse)
+def get_bulk_job(job_id: str):
+    return get_job(job_id)
+
+@bulk_router.get("/{job_id}/result")
+def download_bulk_result(job_id: str):
+    """
+    Descarga los resultados (JSONL, una línea por fila en el orden del archivo) sin cargarlos en memoria.
+    Si el trabajo terminó en FAILURE, los chunks fallidos aparecen como una línea con su error.
+    """
+    state = get_job(job_id)
+    if state["status"] not in (stages[1], stages[2]):
+        raise HTTPException(status_code=409, detail=f"El trabajo aún no termina ({state['done_chunks']}/{state['total_chunks']} chunks).")
+    return StreamingResponse(
+        iter_results(job_id, state["total_chunks"]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{state["tipo"]}_{job_id}.jsonl"'}
+    )
+
+@bulk_router.delete("/{job_id}")
+def delete_bulk_job(job_id: str):
+    get_job(job_id)
+    delete_job(job_id)
+    return {"job_id": job_id, "deleted": True}
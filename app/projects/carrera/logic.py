@@ -1,64 +1,50 @@
-import os
-import numpy as np
-from fastapi import HTTPException
-
 # --- Importaciones de tu proyecto ---
-from app.models.ModelLoader import crear_corpus, detect_language_and_translate_en_es
-
-def predict_carrera_text(loader_carrera, model_folder, text, model_type='auto'):
-    """Predice etiquetas para textos individuales"""
+from app.validations import validate_model
+from app.pipeline import Pipeline, resolve_model, normalize, route_language, infer, top_k, postprocess
+from app.batch import prepare_batch, run_batch
+
+def format_carrera(py, i):
+    """Salida de un texto: nombre de la carrera y top 3 de carreras con sus probabilidades"""
+    pred = py["predictions"][i]
+    labels = py["labels"]
+    output = {"prediction": labels[pred]} # texto de etiqueta
+    if py["probabilities"] is not None:
+        output["probability"] = py["probabilities"][i][pred]
+        output["top3_careers"] = [labels[j] for j in py["top_indices"][i]]
+        output["top3_probabilities"] = py["top_probs"][i]
+    return output
+
+carrera_pipeline = Pipeline("carrera", [
+    resolve_model(),
+    normalize(),
+    route_language("en", "en_es"), # Detectar idioma y traducir a español en caso este en ingles
+    infer(),
+    top_k(3),
+    postprocess(format_carrera),
+])
+
+def predict_carrera_text(loader_carrera, model_folder, text, model_type='auto', texts=None):
+    """
+    Predice etiquetas para textos individuales
+    texts: texto ya lematizado y traducido (endpoint /fusion), se omite el preprocesamiento
+    """
     print(f"Procesamiento de texto para predicción con modelo: {model_folder}")
     print(f"   - Para el texto: {text[:75]}...")
 
-    # Detectar tipo de modelo
-    if model_type == 'auto':
-        if model_folder in loader_carrera.loaded_models:
-            model_type = loader_carrera.loaded_models[model_folder]['type']
-        else:
-            print("🔍 Detectando tipo de modelo...")
-            if os.path.exists(f"{loader_carrera.models_dir}/traditional/{model_folder}"):
-                print("   - Modelo tradicional detectado", loader_carrera.models_dir+"/traditional/"+model_folder)
-                model_type = 'traditional'
-            elif os.path.exists(f"{loader_carrera.models_dir}/transformers/{model_folder}"):
-                print("   - Modelo transformer detectado", loader_carrera.models_dir+"/transformers/"+model_folder)
-                model_type = 'transformer'
-            else:
-                raise HTTPException(status_code=404, detail=f"Modelo {model_folder} no encontrado.")
-
-    # Lematizar y limpiar textos
-    texts = [crear_corpus(text)]
-    texts = detect_language_and_translate_en_es(texts) # Detectar idioma y traducir a español en caso este en ingles
+    ctx = carrera_pipeline.run(loader_carrera, model_folder, [text], model_type, texts)
+    output = ctx["outputs"][0]
 
-    print(f"\\n🔮 Prediciendo {len(texts)} textos con modelo: {model_folder}")
+    return output["prediction"], output.get("probability"), ctx["py"]["labels"], ctx["py"]["probabilities"], output.get("top3_careers", []), output.get("top3_probabilities", [])
 
-    print(f" Ejecutando predicción ...")
-    # Hacer prediccion del texto
-    if model_type == 'traditional':
-        predictions, probabilities, label_predictions = loader_carrera.predict_traditional(model_folder, texts)
-    else:
-        predictions, probabilities, label_predictions = loader_carrera.predict_transformer(model_folder, texts)
-    
-    prediction = label_predictions[predictions[0]] # texto de etiqueta y es un solo valor de predictions
-    probability = probabilities[0][predictions[0]] if probabilities is not None else None
+def predict_carrera_batch(loader_carrera, model_folder, items, model_type='auto'):
+    """Predice etiquetas para un lote de textos (items con id y content)"""
+    model_folder = loader_carrera.resolve_alias(model_folder)
+    model_type = validate_model(loader_carrera, model_folder, model_type)
 
-    # Mostrar resultados
-    print("\\n📋 Resultados:")
-    for i, (text, pred) in enumerate(zip(texts, predictions)):
-        prob_str = ""
-        if probabilities is not None:
-            max_prob = np.max(probabilities[i])
-            prob_str = f" (confianza: {max_prob:.3f})"
+    results, unique_texts, groups = prepare_batch(items, min_length=10)
+    print(f"\n🔮 Prediciendo lote de {len(items)} textos ({len(unique_texts)} distintos) con modelo: {model_folder}")
 
-        print(f"   {i+1}. Texto: '{text[:75]}...'")
-        print(f"      Predicción: {pred}{prob_str} - Clase: {label_predictions[pred]}")
-    
-    # Obtener el top 3 de probabilidades y sus índices
-    top3_career = []
-    top3_probs = []
-    if probabilities is not None:
-        prob_list = probabilities[0]
-        indices = np.argsort(prob_list)[-3:][::-1] # Ordena de menor a mayor, con el top 3 al final y -1 mayor a menor
-        top3_careers = [label_predictions[i] for i in indices] # Convertir a lista la lista de índices
-        top3_probs = [prob_list[i] for i in indices]  # obtener las probabilidades correspondientes
+    def predict_fn(list_text):
+        return carrera_pipeline.run(loader_carrera, model_folder, list_text, model_type)["outputs"]
 
-    return prediction, float(probability), label_predictions, probabilities, top3_careers, top3_probs
+    return {"model_name": model_folder, **run_batch(unique_texts, groups, results, predict_fn)}
@@ -1,10 +1,12 @@
 from typing import Union
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
-from .logic import predict_carrera_text
+from .logic import predict_carrera_text, predict_carrera_batch
 # --- Importaciones de tu proyecto ---
+from app.batch import validate_batch_size
+from app.prediction_cache import predict_cached, predict_batch_coalesced
 from app.models.ModelLoader import ModelLoader
-from app.entities import ItemContent, ItemModelContent, PredictionResponseCareer
+from app.entities import ItemContent, ItemModelContent, PredictionResponseCareer, BatchRequest, BatchResponseCareer
 from app.validations import validate_min_length, validate_not_empty, clean_text
 
 loader_carrera = ModelLoader(tipo='carrera')
@@ -15,7 +17,8 @@ loader_carrera = ModelLoader(tipo='carrera')
 # print("Finalizó carga de modelos de carrera transformadores...")
 
 print("Cargando modelos de carrera tradicionales...")
-loader_carrera.load_traditional_model("Random_Forest_20250808_161322") # Cashear el modelo para evitar recargas innecesarias
+loader_carrera.load_traditional_model("Random_Forest_20250808_161322", pin=True) # Cashear el modelo para evitar recargas innecesarias
+loader_carrera.set_alias("default", "Random_Forest_20250808_161322") # model_name "default"; se cambia en caliente con /models/carrera/swap
 print("Finalizó carga de modelos de carrera tradicionales...")
 
 carrera_router = APIRouter()
@@ -39,7 +42,7 @@ carrera_router = APIRouter()
 #     return {"model_name": model_name, "prediction": prediction, "probability": probability, "top3_career": top3_career, "top3_probs": top3_probs, "class_label": class_label}
 
 @carrera_router.post("/", response_model=PredictionResponseCareer)
-def predict_carrera(item: ItemModelContent, q: Union[str, None] = None):
+async def predict_carrera(item: ItemModelContent, response: Response, q: Union[str, None] = None):
     if q:
         print(f"Query parameter q: {q}")
 
@@ -50,16 +53,30 @@ def predict_carrera(item: ItemModelContent, q: Union[str, None] = None):
     # validate sample_text min limit_min
     validate_min_length(sample_text, min_length=10)
 
-    prediction, probability, class_label, probabilities, top3_careers, top3_probs = predict_carrera_text(loader_carrera, model_name, sample_text)
+    result, cache_status = await predict_cached("carrera", loader_carrera, model_name, sample_text, predict_carrera_text, uncached=(2,)) # class_label sale del modelo
+    response.headers["X-Cache"] = cache_status
+    prediction, probability, class_label, probabilities, top3_careers, top3_probs = result
     print(f"Prediction: {prediction} with probability: {probability}")
     print(f"Probabilities: {len(probabilities)}")
-    print(f"class_label: {len(class_label)}")
     print(f"Top 3 Carreras: {top3_careers}")
     print(f"Top 3 Probabilities: {top3_probs}")
     return {"prediction": prediction, "probability": probability, "top3_careers": top3_careers, "top3_probabilities": top3_probs}
 
+# Lote de textos con id; los duplicados se procesan una sola vez y cada texto tiene su propio error
+# (debe declararse antes de /{model_name})
+@carrera_router.post("/batch", response_model=BatchResponseCareer)
+async def predict_batch(item: BatchRequest, response: Response):
+    model_name = item.model_name.strip()
+    validate_not_empty(model_name)
+    validate_batch_size(item.items)
+
+    result, cache_status = await predict_batch_coalesced("carrera", loader_carrera, model_name, item.items, predict_carrera_batch)
+    response.headers["X-Cache"] = cache_status
+    print(f"Lote: {result['total']} textos, {result['unique']} distintos, {result['errors']} con error")
+    return result
+
 @carrera_router.post("/{model_name}", response_model=PredictionResponseCareer)
-def predict_carrera(model_name: str, item: ItemContent, q: Union[str, None] = None):
+async def predict_carrera(model_name: str, item: ItemContent, response: Response, q: Union[str, None] = None):
     if q:
         print(f"Query parameter q: {q}")
     validate_not_empty(model_name)
@@ -68,10 +85,11 @@ def predict_carrera(model_name: str, item: ItemContent, q: Union[str, None] = No
     # validate sample_text min limit_min
     validate_min_length(sample_text, min_length=10)
 
-    prediction, probability, class_label, probabilities, top3_careers, top3_probs = predict_carrera_text(loader_carrera, model_name, sample_text)
+    result, cache_status = await predict_cached("carrera", loader_carrera, model_name, sample_text, predict_carrera_text, uncached=(2,)) # class_label sale del modelo
+    response.headers["X-Cache"] = cache_status
+    prediction, probability, class_label, probabilities, top3_careers, top3_probs = result
     print(f"Prediction: {prediction} with probability: {probability}")
     print(f"Probabilities: {len(probabilities)}")
-    print(f"class_label: {len(class_label)}")
     print(f"Top 3 Carreras: {top3_careers}")
     print(f"Top 3 Probabilities: {top3_probs}")
     return {"prediction": prediction, "probability": probability, "top3_careers": top3_careers, "top3_probabilities": top3_probs}
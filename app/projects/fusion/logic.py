@@ -0,0 +1,60 @@
+from fastapi import HTTPException
+
+# --- Importaciones de tu proyecto ---
+from app.validations import validate_min_length
+from app.models.ModelLoader import crear_corpus_batch, detectar_idiomas, traducir_por_idioma
+from app.projects.ods.logic import predict_ods_text
+from app.projects.patente.logic import predict_patent_text
+from app.projects.carrera.logic import predict_carrera_text
+
+# Dirección de traducción y largo mínimo de cada tarea (los mismos que sus endpoints)
+TASK_TRANSLATION = {"ods": ("es", "es_en"), "patente": ("es", "es_en"), "carrera": ("en", "en_es")}
+TASK_MIN_LENGTH = {"ods": None, "patente": None, "carrera": 10}
+
+def predict_fusion_text(loaders, text, tasks, models):
+    """
+    Clasifica un texto con varias tareas compartiendo el preprocesamiento:
+    crear_corpus y la detección de idioma se hacen una vez y cada dirección de
+    traducción (es_en para ods/patente, en_es para carrera) también una sola vez.
+    returns: dict con la respuesta de cada tarea y errors por tarea
+    """
+    respuesta = {"errors": {}}
+    validas = []
+    for task in dict.fromkeys(tasks):
+        try:
+            if TASK_MIN_LENGTH[task] is None:
+                validate_min_length(text)
+            else:
+                validate_min_length(text, min_length=TASK_MIN_LENGTH[task])
+            validas.append(task)
+        except HTTPException as e:
+            respuesta["errors"][task] = e.detail
+    if not validas:
+        return respuesta
+
+    corpus = crear_corpus_batch([text])
+    idiomas = detectar_idiomas(corpus)
+    traducidos = {}
+    for task in validas:
+        idioma_origen, direccion = TASK_TRANSLATION[task]
+        if direccion not in traducidos:
+            traducidos[direccion] = traducir_por_idioma(corpus, idioma_origen, direccion, idiomas, lematizar=True)
+
+    for task in validas:
+        model_folder = loaders[task].resolve_alias(models.get(task, "default").strip())
+        texts = traducidos[TASK_TRANSLATION[task][1]]
+        try:
+            if task == "ods":
+                prediction, probability, _, probabilities, top3_indices, _ = predict_ods_text(loaders[task], model_folder, text, texts=texts)
+                respuesta[task] = {"prediction": prediction, "probability": probability, "predictions": top3_indices, "probabilities": probabilities}
+            elif task == "patente":
+                prediction, probability, predictions, probabilities = predict_patent_text(loaders[task], model_folder, text, texts=texts)
+                probabilities = probabilities[0] if len(probabilities) > 0 else None
+                respuesta[task] = {"prediction": prediction, "probability": probability, "predictions": predictions, "probabilities": probabilities}
+            else:
+                prediction, probability, _, _, top3_careers, top3_probs = predict_carrera_text(loaders[task], model_folder, text, texts=texts)
+                respuesta[task] = {"prediction": prediction, "probability": probability, "top3_careers": top3_careers, "top3_probabilities": top3_probs}
+        except HTTPException as e:
+            respuesta["errors"][task] = e.detail
+
+    return respuesta
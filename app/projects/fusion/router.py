@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+
+from .logic import predict_fusion_text
+# --- Importaciones de tu proyecto ---
+from app.concurrency import run_inference
+from app.validations import validate_not_empty, clean_text
+from app.entities import FusionRequest, FusionResponse
+from app.projects.ods.router import loader_ods
+from app.projects.patente.router import loader_patente
+from app.projects.carrera.router import loader_carrera
+
+fusion_router = APIRouter()
+
+loaders = {
+    "ods": loader_ods,
+    "patente": loader_patente,
+    "carrera": loader_carrera,
+}
+
+@fusion_router.post("/", response_model=FusionResponse)
+async def predict_fusion(item: FusionRequest):
+    """ODS, patente y carrera sobre el mismo texto con un solo preprocesamiento y una traducción por dirección"""
+    sample_text = clean_text(item.content)
+    validate_not_empty(sample_text)
+
+    result = await run_inference(predict_fusion_text, loaders, sample_text, item.tasks, item.models)
+    print(f"Fusión {item.tasks}: errores {result['errors']}")
+    return result
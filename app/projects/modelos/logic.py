@@ -0,0 +1,79 @@
+import threading
+import redis
+import json
+import os
+
+# --- Importaciones de tu proyecto ---
+from app.consts import REDIS_HOST, REDIS_PORT
+from app.projects.ods.router import loader_ods
+from app.projects.patente.router import loader_patente
+from app.projects.carrera.router import loader_carrera
+
+# =================================================================
+# --- CAMBIO DE ALIAS ENTRE WORKERS ---
+# =================================================================
+# Con gunicorn cada worker tiene su propia tabla de alias. El worker que recibe
+# POST /models/{tipo}/swap hace su cambio y lo publica en SWAP_CHANNEL; los demás
+# workers (suscritos en el lifespan de main.py) repiten el mismo cambio. Lo mismo
+# pasa con POST /models/refresh: cada worker vuelve a leer el índice de modelos.
+
+SWAP_CHANNEL = "model_swaps"
+
+loaders = {
+    "ods": loader_ods,
+    "patente": loader_patente,
+    "carrera": loader_carrera,
+}
+
+def start_swap(tipo, alias, model_name, estado):
+    """Ejecuta swap_model del loader en un hilo (carga y calentamiento pueden tardar minutos)"""
+    loader = loaders[tipo]
+    threading.Thread(target=loader.swap_model, args=(alias, model_name, estado), name=f"swap-{tipo}-{alias}", daemon=True).start()
+
+def _publish(payload, descripcion):
+    """Publica el aviso en SWAP_CHANNEL; returns: True si se pudo publicar"""
+    payload["origin"] = os.getpid()
+    try:
+        client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+        try:
+            client.publish(SWAP_CHANNEL, json.dumps(payload))
+        finally:
+            client.close()
+        return True
+    except redis.RedisError as e:
+        print(f"[DIAGNÓSTICO ERROR] No se pudo publicar {descripcion} a los demás workers: {e}")
+        return False
+
+def publish_swap(tipo, alias, model_name):
+    """Avisa el cambio a los demás workers; returns: True si se pudo publicar"""
+    payload = {"action": "swap", "tipo": tipo, "alias": alias, "model_name": model_name}
+    return _publish(payload, f"el cambio de {tipo}/{alias}")
+
+def publish_refresh():
+    """Pide a los demás workers que vuelvan a leer el índice de modelos; returns: True si se pudo publicar"""
+    return _publish({"action": "refresh"}, "la recarga del índice de modelos")
+
+def apply_remote_message(data):
+    """Repite en este worker un aviso publicado por otro (se ignoran los propios)"""
+    if data.get("origin") == os.getpid():
+        return
+    if data.get("action") == "refresh":
+        print(f"[DIAGNÓSTICO] Worker {os.getpid()}: recarga del índice de modelos publicada por {data['origin']}")
+        for loader in loaders.values():
+            loader.index.refresh()
+        return
+    apply_remote_swap(data) # los avisos sin "action" son cambios de alias
+
+def apply_remote_swap(data):
+    """Repite en este worker un cambio publicado por otro (se ignoran los propios)"""
+    if data.get("origin") == os.getpid() or data.get("tipo") not in loaders:
+        return
+    loader = loaders[data["tipo"]]
+    if data["model_name"] not in loader.index:
+        loader.index.refresh()
+    estado = loader.begin_swap(data["alias"], data["model_name"])
+    if estado is None:
+        print(f"[DIAGNÓSTICO WARN] Worker {os.getpid()}: ya hay un cambio en curso para {data['tipo']}/{data['alias']}, se ignora el aviso")
+        return
+    print(f"[DIAGNÓSTICO] Worker {os.getpid()}: cambio de {data['tipo']}/{data['alias']} publicado por {data['origin']}")
+    start_swap(data["tipo"], data["alias"], data["model_name"], estado)
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Header, HTTPException
+
+from .logic import loaders, start_swap, publish_swap, publish_refresh
+# --- Importaciones de tu proyecto ---
+from app.entities import ModelSwapRequest
+from app.validations import validate_admin_token
+
+modelos_router = APIRouter()
+
+def get_loader(tipo: str):
+    if tipo not in loaders:
+        raise HTTPException(status_code=404, detail=f"Tipo de modelo {tipo} no encontrado.")
+    return loaders[tipo]
+
+def index_entry(loader, entry):
+    return {**entry, "loaded": entry["name"] in loader.loaded_models}
+
+@modelos_router.get("/")
+def list_models():
+    """Índice de modelos disponibles por tipo (nombre, tipo, artefactos y tamaños)"""
+    return {tipo: [index_entry(loader, entry) for entry in loader.index.list()] for tipo, loader in loaders.items()}
+
+@modelos_router.get("/{tipo}")
+def list_models_tipo(tipo: str):
+    loader = get_loader(tipo)
+    return [index_entry(loader, entry) for entry in loader.index.list()]
+
+@modelos_router.post("/refresh")
+def refresh_models(x_admin_token: str | None = Header(default=None)):
+    """
+    Vuelve a escanear los directorios de modelos (después de copiar o borrar un modelo).
+    Con varios workers la recarga se publica por Redis y cada worker la repite.
+    """
+    validate_admin_token(x_admin_token)
+    refreshed = {tipo: loader.index.refresh() for tipo, loader in loaders.items()}
+    refreshed["broadcast"] = publish_refresh()
+    return refreshed
+
+@modelos_router.get("/{tipo}/aliases")
+def list_aliases(tipo: str):
+    """Modelo al que apunta cada alias y estado del último cambio"""
+    loader = get_loader(tipo)
+    return {"aliases": loader.aliases, "swaps": loader.swaps}
+
+@modelos_router.post("/{tipo}/swap", status_code=202)
+def swap_model(tipo: str, item: ModelSwapRequest, x_admin_token: str | None = Header(default=None)):
+    """
+    Carga y calienta el modelo en segundo plano y después cambia el alias.
+    Las peticiones siguen atendidas por el modelo anterior hasta el cambio;
+    el estado se consulta en GET /models/{tipo}/aliases
+    Con varios workers el cambio se publica por Redis y cada worker lo repite.
+    """
+    validate_admin_token(x_admin_token)
+    loader = get_loader(tipo)
+    model_name = item.model_name.strip()
+    if model_name not in loader.index:
+        raise HTTPException(status_code=404, detail=f"Modelo {model_name} no encontrado en {tipo}.")
+    estado = loader.begin_swap(item.alias, model_name)
+    if estado is None:
+        raise HTTPException(status_code=409, detail=f"Ya hay un cambio en curso para el alias {item.alias}.")
+
+    start_swap(tipo, item.alias, model_name, estado)
+    broadcast = publish_swap(tipo, item.alias, model_name)
+    return {"tipo": tipo, "alias": item.alias, "from": estado["from"], "to": model_name, "status": "accepted", "broadcast": broadcast}
@@ -5,6 +5,7 @@ from fastapi import APIRouter
 
 from .logic import calificate_objective
 # --- Importaciones de tu proyecto ---
+from app.concurrency import llm_flight, request_key
 from app.validations import validate_min_length, validate_not_empty, clean_text
 from app.entities import ItemContent, ItemModelContent, PredictionResponseClassificationObjective
 
@@ -39,7 +40,9 @@ def predict_objetivo(item: ItemModelContent, q: Union[str, None] = None):
     # validate objetivo min limit_min
     validate_min_length(objetivo, min_length=10)
 
-    approved, verbs, detail, suggestions, suggestion_options = calificate_objective(model_name, objetivo)
+    # Peticiones idénticas concurrentes (reintentos, doble envío) comparten una sola evaluación
+    key = request_key("objetivo", model_name, objetivo.lower())
+    approved, verbs, detail, suggestions, suggestion_options = llm_flight.do(key, calificate_objective, model_name, objetivo)
 
     print(f"Approved: {approved}")
     print(f"Verbs: {verbs}")
@@ -58,7 +61,9 @@ def predict_objetivo(model_name: str, item: ItemContent, q: Union[str, None] = N
     # validate objetivo min limit_min
     validate_min_length(objetivo, min_length=10)
 
-    approved, verbs, detail, suggestions, suggestion_options = calificate_objective(model_name, objetivo)
+    # Peticiones idénticas concurrentes (reintentos, doble envío) comparten una sola evaluación
+    key = request_key("objetivo", model_name, objetivo.lower())
+    approved, verbs, detail, suggestions, suggestion_options = llm_flight.do(key, calificate_objective, model_name, objetivo)
 
     print(f"Approved: {approved}")
     print(f"Verbs: {verbs}")
@@ -5,9 +5,11 @@ from .logic import calificate_objectives_gen_esp_simple
 
 # --- Importaciones de Celery tasks ---
 from app.celery.tasks import run_objective_evaluation_task
+from app.celery.dedup import delay_once
 
 # --- Importaciones de tu proyecto ---
 from app.consts import stages
+from app.concurrency import llm_flight, request_key
 from app.validations import validate_min_length, validate_not_empty, clean_text, validation_response_redis
 from app.entities import ItemModelContentObjectives, TaskCreationResponse, FullEvaluationResponse, ItemContentObjectives
 
@@ -17,6 +19,10 @@ from celery.result import AsyncResult
 
 objetivo_gen_spe_router = APIRouter()
 
+def normalize_objectives(objetivo, objetivos_especificos):
+    """Payload normalizado para detectar evaluaciones idénticas"""
+    return objetivo.lower(), [clean_text(especifico).lower() for especifico in objetivos_especificos]
+
 # # Calificador Objetivos
 # @objetivo_gen_spe_router.get("/")
 # def read_objetivos():
@@ -59,7 +65,11 @@ def predict_objetivos(item: ItemModelContentObjectives, q: Union[str, None] = No
     if not objetivos_especificos or len(objetivos_especificos) < 3 or len(objetivos_especificos) > 4:
         raise ValueError("La lista de objetivos específicos no puede estar vacía, tampoco menos de 3 ni más de 4.")
 
-    alineacion_aprobada, evaluacion_conjunta, evaluacion_individual = calificate_objectives_gen_esp_simple(model_name, objetivo, objetivos_especificos)
+    # Peticiones idénticas concurrentes (reintentos, doble envío) comparten una sola evaluación
+    key = request_key("objetivos", model_name, *normalize_objectives(objetivo, objetivos_especificos))
+    alineacion_aprobada, evaluacion_conjunta, evaluacion_individual = llm_flight.do(
+        key, calificate_objectives_gen_esp_simple, model_name, objetivo, objetivos_especificos
+    )
 
     print(f"Approved: {alineacion_aprobada}")
     print(f"Detail: {evaluacion_conjunta['alignment_detail']}")
@@ -87,7 +97,11 @@ def predict_objetivos(model_name: str, item: ItemContentObjectives, q: Union[str
     if not objetivos_especificos or len(objetivos_especificos) < 3 or len(objetivos_especificos) > 4:
         raise ValueError("La lista de objetivos específicos no puede estar vacía, tampoco menos de 3 ni más de 4.")
 
-    alineacion_aprobada, evaluacion_conjunta, evaluacion_individual = calificate_objectives_gen_esp_simple(model_name, objetivo, objetivos_especificos)
+    # Peticiones idénticas concurrentes (reintentos, doble envío) comparten una sola evaluación
+    key = request_key("objetivos", model_name, *normalize_objectives(objetivo, objetivos_especificos))
+    alineacion_aprobada, evaluacion_conjunta, evaluacion_individual = llm_flight.do(
+        key, calificate_objectives_gen_esp_simple, model_name, objetivo, objetivos_especificos
+    )
 
     print(f"Approved: {alineacion_aprobada}")
     print(f"Detail: {evaluacion_conjunta['alignment_detail']}")
@@ -116,14 +130,18 @@ def predict_objetivos_async(item: ItemModelContentObjectives):
         raise HTTPException(status_code=400, detail="La lista de objetivos específicos debe contener entre 3 y 4 elementos.")
 
     # 2. Iniciar la tarea en segundo plano
-    # En lugar de llamar a la función directamente, usamos .delay()
-    # Esto envía la tarea a la cola de RabbitMQ y no espera.
-    task = run_objective_evaluation_task.delay(
-        model_name, objetivo, objetivos_especificos
+    # En lugar de llamar a la función directamente, se envía la tarea a la cola de RabbitMQ y no espera.
+    # Un envío duplicado (mismo modelo y objetivos) devuelve la tarea existente
+    key = request_key("objetivos_async", model_name, *normalize_objectives(objetivo, objetivos_especificos))
+    task_id, created = delay_once(
+        run_objective_evaluation_task, key, model_name, objetivo, objetivos_especificos
     )
 
     # 3. Responder inmediatamente con el ID de la tarea Processing
-    return {"task_id": task.id, "status": stages[0]}
+    if not created:
+        print(f"[DIAGNÓSTICO] Envío duplicado, se reutiliza la tarea {task_id}")
+        return {"task_id": task_id, "status": AsyncResult(task_id, app=celery_app).status}
+    return {"task_id": task_id, "status": stages[0]}
 
 # --- Obtener resultado de la tarea ---
 @objetivo_gen_spe_router.get("/result/{task_id}", response_model=FullEvaluationResponse)
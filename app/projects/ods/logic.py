@@ -1,68 +1,50 @@
-import os
-import numpy as np
-from fastapi import HTTPException
-
 # --- Importaciones de tu proyecto ---
-from app.models.ModelLoader import crear_corpus, detect_language_and_translate_es_en
-
-def predict_ods_text(loader_ods, model_folder, text, model_type='auto'):
-    """Predice etiquetas para textos individuales"""
+from app.validations import validate_model
+from app.pipeline import Pipeline, resolve_model, normalize, route_language, infer, top_k, postprocess
+from app.batch import prepare_batch, run_batch
+
+def format_ods(py, i):
+    """Salida de un texto: ODS del 1 al 17, top 3 (índices desde 0) y probabilidades"""
+    pred = py["predictions"][i]
+    output = {"prediction": pred + 1}
+    if py["probabilities"] is not None:
+        output["probability"] = py["probabilities"][i][pred]
+        output["predictions"] = py["top_indices"][i]
+        output["probabilities"] = py["probabilities"][i]
+    return output
+
+ods_pipeline = Pipeline("ods", [
+    resolve_model(),
+    normalize(),
+    route_language("es", "es_en"), # Detectar idioma y traducir a ingles en caso este en español
+    infer(label_offset=1), # los modelos tradicionales predicen el ODS (desde 1)
+    top_k(3),
+    postprocess(format_ods),
+])
+
+def predict_ods_text(loader_ods, model_folder, text, model_type='auto', texts=None):
+    """
+    Predice etiquetas para textos individuales
+    texts: texto ya lematizado y traducido (endpoint /fusion), se omite el preprocesamiento
+    """
     print(f"Procesamiento de texto para predicción con modelo: {model_folder}")
     print(f"   - Para el texto: {text[:75]}...")
 
-    # Detectar tipo de modelo
-    if model_type == 'auto':
-        if model_folder in loader_ods.loaded_models:
-            model_type = loader_ods.loaded_models[model_folder]['type']
-        else:
-            print("🔍 Detectando tipo de modelo...")
-            if os.path.exists(f"{loader_ods.models_dir}/traditional/{model_folder}"):
-                print("   - Modelo tradicional detectado", loader_ods.models_dir+"/traditional/"+model_folder)
-                model_type = 'traditional'
-            elif os.path.exists(f"{loader_ods.models_dir}/transformers/{model_folder}"):
-                print("   - Modelo transformer detectado", loader_ods.models_dir+"/transformers/"+model_folder)
-                model_type = 'transformer'
-            else:
-                raise HTTPException(status_code=404, detail=f"Modelo {model_folder} no encontrado.")
+    ctx = ods_pipeline.run(loader_ods, model_folder, [text], model_type, texts)
+    output, py = ctx["outputs"][0], ctx["py"]
 
-    # Lematizar y limpiar textos
-    texts = [crear_corpus(text)]
-    texts = detect_language_and_translate_es_en(texts) # Detectar idioma y traducir a ingles en caso este en español
+    # Top 3 de probabilidades y sus índices
+    return output["prediction"], output.get("probability"), py["predictions"], py["probabilities"], py["top_indices"] or [], py["top_probs"] or []
 
-    print(f"\\n🔮 Prediciendo {len(texts)} textos con modelo: {model_folder}")
+def predict_ods_batch(loader_ods, model_folder, items, model_type='auto'):
+    """Predice etiquetas para un lote de textos (items con id y content)"""
+    model_folder = loader_ods.resolve_alias(model_folder)
+    model_type = validate_model(loader_ods, model_folder, model_type)
 
-    print(f" Ejecutando predicción ...")
-    # Hacer prediccion del texto
-    if model_type == 'traditional':
-        predictions, probabilities = loader_ods.predict_traditional(model_folder, texts)
-        predictions = [predictions[0] - 1] # ya que solo es uno
-    else:
-        predictions, probabilities = loader_ods.predict_transformer(model_folder, texts)
-    
-    prediction = predictions[0] + 1
-    probability = probabilities[0][predictions[0]] if probabilities is not None else None
+    results, unique_texts, groups = prepare_batch(items)
+    print(f"\n🔮 Prediciendo lote de {len(items)} textos ({len(unique_texts)} distintos) con modelo: {model_folder}")
 
-    # Mostrar resultados
-    print("\\n📋 Resultados:")
-    for i, (text, pred) in enumerate(zip(texts, predictions)):
-        prob_str = ""
-        if probabilities is not None:
-            max_prob = np.max(probabilities[i])
-            prob_str = f" (confianza: {max_prob:.3f})"
+    def predict_fn(list_text):
+        return ods_pipeline.run(loader_ods, model_folder, list_text, model_type)["outputs"]
 
-        print(f"   {i+1}. Texto: '{text[:75]}...'")
-        if model_type == 'traditional':
-            print(f"      Predicción: {pred}{prob_str}")
-        else:
-            print(f"      Predicción: {pred + 1}{prob_str}")
-    
-    # Obtener el top 3 de probabilidades y sus índices
-    top3_indices = []
-    top3_probs = []
-    if probabilities is not None:
-        for prob_list in probabilities:
-            indices = np.argsort(prob_list)[-3:][::-1] # Ordena de menor a mayor, con el top 3 al final y -1 mayor a menor
-            top3_indices.append(indices.tolist()) # Convertir a lista la lista de índices
-            top3_probs.append([prob_list[i] for i in indices])  # obtener las probabilidades correspondientes
-    
-    return int(prediction), float(probability), predictions, probabilities, top3_indices, top3_probs
+    return {"model_name": model_folder, **run_batch(unique_texts, groups, results, predict_fn)}
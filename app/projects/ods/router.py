@@ -1,16 +1,19 @@
 from typing import Union
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
-from .logic import predict_ods_text
+from .logic import predict_ods_text, predict_ods_batch
 # --- Importaciones de tu proyecto ---
+from app.batch import validate_batch_size
+from app.prediction_cache import predict_cached, predict_batch_coalesced
 from app.validations import validate_min_length, validate_not_empty, clean_text
-from app.entities import ItemContent, ItemModelContent, PredictionResponseODS
+from app.entities import ItemContent, ItemModelContent, PredictionResponseODS, BatchRequest, BatchResponseODS
 from app.models.ModelLoader import ModelLoader
 
 loader_ods = ModelLoader()
 
 print("Cargando modelos de ods tradicionales...")
-loader_ods.load_transformer_model("distilbert_10e_24b_0") # Cashear el modelo para evitar recargas innecesarias
+loader_ods.load_transformer_model("distilbert_10e_24b_0", pin=True) # Cashear el modelo para evitar recargas innecesarias
+loader_ods.set_alias("default", "distilbert_10e_24b_0") # model_name "default"; se cambia en caliente con /models/ods/swap
 print("Finalizó carga de modelos de ods transformadores...")
 
 # print("Cargando modelos de ods tradicionales...")
@@ -36,7 +39,7 @@ ods_router = APIRouter()
 #     return {"model_name": model_name, "prediction": prediction, "probability": probability, "predictions": predictions, "probabilities": probabilities}
 
 @ods_router.post("/", response_model=PredictionResponseODS)
-def predict_text(item: ItemModelContent, q: Union[str, None] = None):
+async def predict_text(item: ItemModelContent, response: Response, q: Union[str, None] = None):
     if q:
         print(f"Query parameter q: {q}")
 
@@ -47,7 +50,9 @@ def predict_text(item: ItemModelContent, q: Union[str, None] = None):
     # validate sample_text min limit_min
     validate_min_length(sample_text)
 
-    prediction, probability, predictions, probabilities, top3_indices, top3_probs = predict_ods_text(loader_ods, model_name, sample_text)
+    result, cache_status = await predict_cached("ods", loader_ods, model_name, sample_text, predict_ods_text)
+    response.headers["X-Cache"] = cache_status
+    prediction, probability, predictions, probabilities, top3_indices, top3_probs = result
     print(f"Prediction: {prediction} with probability: {probability}")
     print(f"Predictions: {predictions}")
     print(f"Probabilities: {probabilities}")
@@ -55,8 +60,21 @@ def predict_text(item: ItemModelContent, q: Union[str, None] = None):
     print(f"Top 3 Probabilities: {top3_probs}")
     return {"prediction": prediction, "probability": probability, "predictions": top3_indices, "probabilities": probabilities}
 
+# Lote de textos con id; los duplicados se procesan una sola vez y cada texto tiene su propio error
+# (debe declararse antes de /{model_name})
+@ods_router.post("/batch", response_model=BatchResponseODS)
+async def predict_batch(item: BatchRequest, response: Response):
+    model_name = item.model_name.strip()
+    validate_not_empty(model_name)
+    validate_batch_size(item.items)
+
+    result, cache_status = await predict_batch_coalesced("ods", loader_ods, model_name, item.items, predict_ods_batch)
+    response.headers["X-Cache"] = cache_status
+    print(f"Lote: {result['total']} textos, {result['unique']} distintos, {result['errors']} con error")
+    return result
+
 @ods_router.post("/{model_name}", response_model=PredictionResponseODS)
-def predict_text(model_name: str, item: ItemContent, q: Union[str, None] = None):
+async def predict_text(model_name: str, item: ItemContent, response: Response, q: Union[str, None] = None):
     if q:
         print(f"Query parameter q: {q}")
 
@@ -66,7 +84,9 @@ def predict_text(model_name: str, item: ItemContent, q: Union[str, None] = None)
     # validate sample_text min limit_min
     validate_min_length(sample_text)
 
-    prediction, probability, predictions, probabilities, top3_indices, top3_probs = predict_ods_text(loader_ods, model_name, sample_text)
+    result, cache_status = await predict_cached("ods", loader_ods, model_name, sample_text, predict_ods_text)
+    response.headers["X-Cache"] = cache_status
+    prediction, probability, predictions, probabilities, top3_indices, top3_probs = result
     print(f"Prediction: {prediction} with probability: {probability}")
     print(f"Predictions: {predictions}")
     print(f"Probabilities: {probabilities}")
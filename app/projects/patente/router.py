@@ -1,9 +1,11 @@
 from typing import Union
-from fastapi import  APIRouter
+from fastapi import APIRouter, Response
 
-from .logic import predict_patent_text
+from .logic import predict_patent_text, predict_patent_batch
 # --- Importaciones de tu proyecto ---
-from app.entities import ItemContent, ItemModelContent, PredictionResponse
+from app.batch import validate_batch_size
+from app.prediction_cache import predict_cached, predict_batch_coalesced
+from app.entities import ItemContent, ItemModelContent, PredictionResponse, BatchRequest, BatchResponse
 from app.validations import validate_min_length, validate_not_empty, clean_text
 from app.models.ModelLoader import ModelLoader
 
@@ -14,7 +16,8 @@ loader_patente = ModelLoader(tipo='patente')
 # print("Finalizó carga de modelos de patente transformadores...")
 
 print("Cargando modelos de patente tradicionales...")
-loader_patente.load_traditional_model("Random_Forest_20250813_144340") # Cashear el modelo para evitar recargas innecesarias
+loader_patente.load_traditional_model("Random_Forest_20250813_144340", pin=True) # Cashear el modelo para evitar recargas innecesarias
+loader_patente.set_alias("default", "Random_Forest_20250813_144340") # model_name "default"; se cambia en caliente con /models/patente/swap
 print("Finalizó carga de modelos de patente tradicionales...")
 
 patente_router = APIRouter()
@@ -34,7 +37,7 @@ patente_router = APIRouter()
 #     return {"model_name": model_name, "prediction": prediction, "probability": probability, "predictions": predictions, "probabilities": probabilities}
 
 @patente_router.post("/", response_model=PredictionResponse)
-def predict_project(item: ItemModelContent, q: Union[str, None] = None):
+async def predict_project(item: ItemModelContent, response: Response, q: Union[str, None] = None):
     if q:
         print(f"Query parameter q: {q}")
 
@@ -45,15 +48,30 @@ def predict_project(item: ItemModelContent, q: Union[str, None] = None):
     # validate sample_text min limit_min
     validate_min_length(sample_text)
 
-    prediction, probability, predictions, probabilities = predict_patent_text(loader_patente, model_name, sample_text)
+    result, cache_status = await predict_cached("patente", loader_patente, model_name, sample_text, predict_patent_text)
+    response.headers["X-Cache"] = cache_status
+    prediction, probability, predictions, probabilities = result
     probabilities = probabilities[0] if len(probabilities) > 0 else None  # Asegurar que las probabilidades sean una lista
     print(f"Prediction: {prediction} with probability: {probability}")
     print(f"Predictions: {predictions}")
     print(f"Probabilities: {probabilities}")
     return {"prediction": prediction, "probability": probability, "predictions": predictions, "probabilities": probabilities}
 
+# Lote de textos con id; los duplicados se procesan una sola vez y cada texto tiene su propio error
+# (debe declararse antes de /{model_name})
+@patente_router.post("/batch", response_model=BatchResponse)
+async def predict_project_batch(item: BatchRequest, response: Response):
+    model_name = item.model_name.strip()
+    validate_not_empty(model_name)
+    validate_batch_size(item.items)
+
+    result, cache_status = await predict_batch_coalesced("patente", loader_patente, model_name, item.items, predict_patent_batch)
+    response.headers["X-Cache"] = cache_status
+    print(f"Lote: {result['total']} textos, {result['unique']} distintos, {result['errors']} con error")
+    return result
+
 @patente_router.post("/{model_name}", response_model=PredictionResponse)
-def predict_project(model_name: str, item: ItemContent, q: Union[str, None] = None):
+async def predict_project(model_name: str, item: ItemContent, response: Response, q: Union[str, None] = None):
     if q:
         print(f"Query parameter q: {q}")
 
@@ -63,7 +81,9 @@ def predict_project(model_name: str, item: ItemContent, q: Union[str, None] = No
     # validate sample_text min limit_min
     validate_min_length(sample_text)
 
-    prediction, probability, predictions, probabilities = predict_patent_text(loader_patente, model_name, sample_text)
+    result, cache_status = await predict_cached("patente", loader_patente, model_name, sample_text, predict_patent_text)
+    response.headers["X-Cache"] = cache_status
+    prediction, probability, predictions, probabilities = result
     probabilities = probabilities[0] if len(probabilities) > 0 else None  # Asegurar que las probabilidades sean una lista
     print(f"Prediction: {prediction} with probability: {probability}")
     print(f"Predictions: {predictions}")
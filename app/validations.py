@@ -1,7 +1,9 @@
 from pydantic import ValidationError
 from fastapi import HTTPException
+from dotenv import load_dotenv
 from .consts import limit_min
 import string
+import os
 
 def clean_text(text: str) -> str:
     """Limpia el texto eliminando espacios extra y puntuación innecesaria."""
@@ -21,6 +23,22 @@ def validate_not_empty(text: str):
     if not text.strip():
         raise HTTPException(status_code=422, detail="El texto no puede estar vacío o contener solo espacios en blanco.")
     
+def validate_model(loader, model_folder, model_type='auto'):
+    """Verifica que el modelo exista en el índice del loader (sin tocar el disco) y devuelve su tipo"""
+    model_index_type = loader.index.model_type(model_folder)
+    if model_index_type is None:
+        raise HTTPException(status_code=404, detail=f"Modelo {model_folder} no encontrado.")
+    return model_index_type if model_type == 'auto' else model_type
+
+def validate_admin_token(token: str | None):
+    """Verifica el token de administración (variable de entorno ADMIN_TOKEN)"""
+    load_dotenv()
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Endpoints de administración deshabilitados: ADMIN_TOKEN no configurado.")
+    if token != admin_token:
+        raise HTTPException(status_code=401, detail="Token de administración inválido.")
+
 def validation_response_redis(task_result, model_struc):
     """Valida si la respuesta esta aun ejecutandose, si no esta autorizado el token, si ha fallado la tarea, si el token tiene la estructura que se espera responder ya que puede ser incorrecto el token"""
     if not task_result.ready():
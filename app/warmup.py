@@ -0,0 +1,94 @@
+import time
+
+from app.consts import WARMUP_REPEATS
+from app.models.ModelLoader import crear_corpus_batch, detectar_idiomas_xlmr, _generate_translations, loaded_shared_models, validar_detector_idioma
+from app.projects.ods.router import loader_ods
+from app.projects.patente.router import loader_patente
+from app.projects.carrera.router import loader_carrera
+
+# =================================================================
+# --- CALENTAMIENTO DE MODELOS AL INICIAR ---
+# =================================================================
+
+# Textos sintéticos en español e inglés de varias longitudes (corta, media y larga),
+# para ejercitar los caminos de padding y el generate de MarianMT con distintos tamaños
+_BASE_ES = (
+    "El proyecto propone un sistema de monitoreo de la calidad del agua en comunidades rurales "
+    "mediante sensores de bajo costo y un modelo de aprendizaje automático que alerta a las "
+    "autoridades locales sobre posibles focos de contaminación. "
+)
+_BASE_EN = (
+    "The project proposes a water quality monitoring system for rural communities using "
+    "low cost sensors and a machine learning model that alerts local authorities about "
+    "possible sources of contamination. "
+)
+WARMUP_TEXTS = {
+    "es": ["Sistema de riego inteligente para pequeños agricultores.", _BASE_ES, _BASE_ES * 6],
+    "en": ["Smart irrigation system for small farmers.", _BASE_EN, _BASE_EN * 6],
+}
+
+loaders = {
+    "ods": loader_ods,
+    "patente": loader_patente,
+    "carrera": loader_carrera,
+}
+
+# Estado que se expone en /health/ready
+warmup_state = {"ready": False, "started_at": None, "finished_at": None, "stages": {}, "errors": {}}
+
+
+def _stage(name, fn, *args, **kwargs):
+    inicio = time.perf_counter()
+    try:
+        for _ in range(WARMUP_REPEATS):
+            fn(*args, **kwargs)
+    except Exception as e:
+        warmup_state["errors"][name] = str(e)
+        print(f"[DIAGNÓSTICO WARN] Calentamiento {name} falló: {e}")
+    segundos = round(time.perf_counter() - inicio, 3)
+    warmup_state["stages"][name] = segundos
+    print(f"🔥 Calentamiento {name}: {segundos}s")
+
+def warmup_models():
+    """
+    Pasa los textos sintéticos por los modelos compartidos y por el forward de cada
+    modelo cargado, registrando el tiempo de cada etapa.
+    Las etapas se llaman directamente y no con predict_*_text, así los textos sintéticos
+    no quedan en los caches (corpus, traducciones, predicciones) ni en /stats.
+    Los errores se registran y no detienen el resto del calentamiento.
+    """
+    warmup_state["started_at"] = time.time()
+    todos = WARMUP_TEXTS["es"] + WARMUP_TEXTS["en"]
+    compartidos = loaded_shared_models()
+
+    _stage("preprocesamiento", crear_corpus_batch, todos, usar_cache=False)
+    if "detector" in compartidos:
+        _stage("deteccion_idioma", detectar_idiomas_xlmr, todos)
+    # Tasa de acuerdo del nivel léxico con la lista etiquetada (se publica en /stats)
+    try:
+        validacion = validar_detector_idioma()
+        print(f"🌐 Validación del detector de idioma: {validacion}")
+    except Exception as e:
+        warmup_state["errors"]["validacion_idioma"] = str(e)
+        print(f"[DIAGNÓSTICO WARN] Validación del detector de idioma falló: {e}")
+
+    for direccion, idioma in (("es_en", "es"), ("en_es", "en")):
+        if direccion in compartidos:
+            _stage(f"traduccion_{direccion}", _generate_translations, WARMUP_TEXTS[idioma], direccion, len(WARMUP_TEXTS[idioma]))
+
+    # Forward de cada modelo cargado con los textos sintéticos ya lematizados
+    try:
+        lemas = crear_corpus_batch(todos, usar_cache=False)
+    except Exception:
+        lemas = None # el error ya quedó registrado en la etapa de preprocesamiento
+    for tipo, loader in loaders.items():
+        for model_folder in list(loader.loaded_models.keys()):
+            model_type = loader.index.model_type(model_folder)
+            _stage(f"{tipo}/{model_folder}", loader.warmup_model, model_folder, model_type, lemas)
+
+    warmup_state["finished_at"] = time.time()
+    warmup_state["ready"] = True
+    total = round(warmup_state["finished_at"] - warmup_state["started_at"], 3)
+    print(f"[DIAGNÓSTICO] Calentamiento terminado en {total}s ({len(warmup_state['errors'])} errores)")
+    return warmup_state
+
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakePipeline:
+    """Acumula los comandos y los ejecuta en orden con execute()"""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue_command(*args, **kwargs):
+            self._commands.append((getattr(self._client, name), args, kwargs))
+            return self
+        return queue_command
+
+    def execute(self):
+        results = [command(*args, **kwargs) for command, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+class FakeRedis:
+    """Redis en memoria con los comandos que usan los trabajos masivos (decode_responses=True)"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.data.setdefault(key, {})
+        updates = dict(mapping or {})
+        if field is not None:
+            updates[field] = value
+        added = sum(1 for name in updates if name not in fields)
+        fields.update({name: str(value) for name, value in updates.items()})
+        return added
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hincrby(self, key, field, amount=1):
+        fields = self.data.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        return int(fields[field])
+
+    def sadd(self, key, *values):
+        members = self.data.setdefault(key, set())
+        added = {str(value) for value in values} - members
+        members.update(added)
+        return len(added)
+
+    def srem(self, key, *values):
+        members = self.data.get(key, set())
+        removed = {str(value) for value in values} & members
+        members.difference_update(removed)
+        return len(removed)
+
+    def sismember(self, key, value):
+        return str(value) in self.data.get(key, set())
+
+    def scard(self, key):
+        return len(self.data.get(key, set()))
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+        return key in self.data
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
@@ -0,0 +1,110 @@
+import io
+import json
+
+import pytest
+
+from app.consts import stages
+from app.projects.bulk import logic
+
+
+@pytest.fixture
+def bulk(fake_redis, tmp_path, monkeypatch):
+    monkeypatch.setattr(logic, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(logic, "BULK_JOBS_DIR", str(tmp_path))
+    return logic
+
+
+def _upload(bulk, job_id, rows, chunk_size=2):
+    data = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+    total_rows, total_chunks = bulk.split_upload(job_id, io.BytesIO(data), "datos.jsonl", chunk_size=chunk_size)
+    bulk.create_job(job_id, "ods", "default", total_rows, total_chunks)
+    return total_rows, total_chunks
+
+
+def _rows(n):
+    return [{"id": f"r{i}", "content": f"texto {i}"} for i in range(n)]
+
+
+def _finish_chunk(bulk, job_id, index, errors=0):
+    items = bulk.read_chunk(job_id, index)
+    results = [{"id": item.id, "prediction": 1} for item in items]
+    bulk.write_chunk_results(job_id, index, results)
+    return bulk.mark_chunk_done(job_id, index, len(results), errors)
+
+
+def test_split_upload_writes_chunks_in_order(bulk):
+    assert _upload(bulk, "job", _rows(5)) == (5, 3)
+    assert [item.id for item in bulk.read_chunk("job", 2)] == ["r4"]
+    state = bulk.get_job("job")
+    assert state["status"] == stages[0]
+    assert state["done_chunks"] == 0
+
+
+def test_job_succeeds_when_every_chunk_is_done(bulk):
+    _upload(bulk, "job", _rows(5))
+    _finish_chunk(bulk, "job", 0)
+    state = _finish_chunk(bulk, "job", 2, errors=1)
+    assert state["status"] == stages[0]
+    assert state["done_chunks"] == 2
+
+    state = _finish_chunk(bulk, "job", 1)
+    assert state["status"] == stages[1]
+    assert (state["done_chunks"], state["done_rows"], state["errors"], state["failed_chunks"]) == (3, 5, 1, 0)
+
+    lines = b"".join(bulk.iter_results("job", state["total_chunks"])).decode("utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [f"r{i}" for i in range(5)]
+
+
+def test_redelivered_chunk_is_counted_once(bulk):
+    _upload(bulk, "job", _rows(4))
+    _finish_chunk(bulk, "job", 0)
+    state = _finish_chunk(bulk, "job", 0)
+    assert state["status"] == stages[0]
+    assert (state["done_chunks"], state["done_rows"]) == (1, 2)
+
+
+def test_chunk_without_results_fails_the_job(bulk):
+    _upload(bulk, "job", _rows(4))
+    _finish_chunk(bulk, "job", 0)
+    state = bulk.mark_chunk_failed("job", 1, 2)
+    assert state["status"] == stages[2]
+    assert (state["done_chunks"], state["failed_chunks"], state["done_rows"], state["errors"]) == (2, 1, 4, 2)
+
+    lines = [json.loads(line) for line in b"".join(bulk.iter_results("job", 2)).decode("utf-8").splitlines()]
+    assert [line.get("id") for line in lines[:2]] == ["r0", "r1"]
+    assert lines[2] == {"chunk": 1, "error": "Resultados del chunk no disponibles."}
+
+
+def test_redelivery_recovers_a_failed_chunk(bulk):
+    _upload(bulk, "job", _rows(4))
+    _finish_chunk(bulk, "job", 0)
+    bulk.mark_chunk_failed("job", 1, 2)
+    state = _finish_chunk(bulk, "job", 1)
+    assert state["status"] == stages[1]
+    assert (state["done_chunks"], state["failed_chunks"]) == (2, 0)
+
+
+def test_failure_after_results_were_written_is_ignored(bulk):
+    _upload(bulk, "job", _rows(2))
+    _finish_chunk(bulk, "job", 0)
+    state = bulk.mark_chunk_failed("job", 0, 2)
+    assert state["status"] == stages[1]
+    assert (state["failed_chunks"], state["errors"]) == (0, 0)
+
+
+def test_delete_job_removes_state_and_files(bulk, fake_redis, tmp_path):
+    _upload(bulk, "job", _rows(2))
+    _finish_chunk(bulk, "job", 0)
+    bulk.delete_job("job")
+    assert fake_redis.data == {}
+    assert not (tmp_path / "job").exists()
+    with pytest.raises(logic.HTTPException) as excinfo:
+        bulk.get_job("job")
+    assert excinfo.value.status_code == 404
+
+
+def test_upload_rejects_rows_that_are_not_objects(bulk, tmp_path):
+    with pytest.raises(logic.HTTPException) as excinfo:
+        bulk.split_upload("job", io.BytesIO(b'{"id": 1, "content": "a"}\n[1, 2]\n'), "datos.jsonl")
+    assert excinfo.value.status_code == 400
+    assert not (tmp_path / "job").exists()
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.concurrency import SingleFlight, AsyncSingleFlight, BoundedExecutor, OverloadedError
+
+
+def test_single_flight_runs_once_for_concurrent_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "modelo"
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(flight.do("k", load)))
+    owner.start()
+    started.wait(1)
+    waiters = [threading.Thread(target=lambda: results.append(flight.do("k", load))) for _ in range(4)]
+    for t in waiters:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in [owner] + waiters:
+        t.join(1)
+
+    assert calls == [1]
+    assert results == ["modelo"] * 5
+    assert flight.in_flight() == []
+
+
+def test_single_flight_shares_the_exception_and_forgets_the_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("sin modelo")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_async_single_flight_coalesces_and_reports_shared():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def predict():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"prediction": 3}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", predict) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert calls == [1]
+    assert [result for result, _ in results] == [{"prediction": 3}] * 3
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert flight.stats() == {"in_flight": 0, "coalesced": 2}
+
+
+def test_async_single_flight_survives_a_cancelled_waiter():
+    flight = AsyncSingleFlight()
+
+    async def predict():
+        await asyncio.sleep(0.05)
+        return 7
+
+    async def main():
+        owner = asyncio.create_task(flight.do("k", predict))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("k", predict))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await owner
+
+    assert asyncio.run(main()) == (7, False)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_bounded_executor_rejects_when_workers_and_queue_are_full():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        running = [asyncio.create_task(executor.run(release.wait, 1)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["active"] == 1
+        assert executor.stats()["queued"] == 1
+        with pytest.raises(OverloadedError):
+            await executor.run(lambda: None)
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(main())
+    assert executor.rejected == 1
+    assert executor._admitted == 0
+
+
+def test_bounded_executor_keeps_the_slot_until_a_cancelled_task_finishes():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def main():
+        task = asyncio.create_task(executor.run(release.wait, 1))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # El hilo sigue ocupado: el lugar no se libera con la cancelación
+        assert executor._admitted == 1
+        with pytest.raises(OverloadedError):
+            await executor.run(lambda: None)
+
+        release.set()
+        for _ in range(100):
+            if executor._admitted == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor._admitted == 0
+        assert await executor.run(lambda: "ok") == "ok"
+
+    asyncio.run(main())
+
+
+def test_bounded_executor_propagates_exceptions_and_releases():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+
+    def fail():
+        raise RuntimeError("forward")
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await executor.run(fail)
+        await asyncio.sleep(0)
+        return executor._admitted
+
+    assert asyncio.run(main()) == 0
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from app.models.microbatch import MicroBatcher, BatcherClosedError
+
+
+def test_concurrent_submits_share_one_batch():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(4)]
+    assert [future.result(1) for future in futures] == [0, 2, 4, 6]
+    assert calls == [[0, 1, 2, 3]]
+    assert batcher.stats()["batch_size"]["count"] == 1
+    batcher.close()
+
+
+def test_batch_is_cut_at_max_batch_size():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(len(items))
+        return items
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=2, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(5)]
+    assert [future.result(2) for future in futures] == [0, 1, 2, 3, 4]
+    assert calls == [2, 2, 1]
+    batcher.close()
+
+
+def test_batch_error_reaches_every_future():
+    def batch_fn(items):
+        raise RuntimeError("forward")
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=2, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(1)
+    # El hilo sigue atendiendo después del error
+    batcher.batch_fn = lambda items: items
+    assert batcher.submit(9).result(1) == 9
+    batcher.close()
+
+
+def test_submit_after_close_fails():
+    batcher = MicroBatcher("test", lambda items: items)
+    assert batcher.submit(1).result(1) == 1
+    batcher.close()
+    with pytest.raises(BatcherClosedError):
+        batcher.submit(2)
+
+
+def test_close_serves_what_is_already_queued():
+    release = threading.Event()
+
+    def batch_fn(items):
+        release.wait(1)
+        return items
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=1, max_wait_ms=1)
+    futures = [batcher.submit(i) for i in range(3)]
+    batcher.close()
+    release.set()
+    assert [future.result(1) for future in futures] == [0, 1, 2]
+
+
+def test_cancelled_future_is_skipped():
+    release = threading.Event()
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        release.wait(1)
+        return items
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=1, max_wait_ms=1)
+    first = batcher.submit(1)
+    time.sleep(0.05)
+    expired = batcher.submit(2)
+    assert expired.cancel()
+    # Un Future que ya entró a un lote no se puede cancelar
+    assert not first.cancel()
+    last = batcher.submit(3)
+    release.set()
+    assert first.result(1) == 1
+    assert last.result(1) == 3
+    assert calls == [[1], [3]]
+    batcher.close()
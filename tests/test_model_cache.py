@@ -0,0 +1,49 @@
+from app.models.cache import ModelCache
+
+
+def test_evicts_least_recently_used_model():
+    cache = ModelCache(max_models=2)
+    cache.put("a", {"model": "a"})
+    cache.put("b", {"model": "b"})
+    cache.get("a")
+    cache.put("c", {"model": "c"})
+    assert cache.keys() == ["a", "c"]
+    assert cache.evictions == 1
+
+
+def test_pinned_models_are_not_evicted():
+    cache = ModelCache(max_models=1)
+    cache.put("default", {}, pin=True)
+    cache.put("otro", {})
+    assert "default" in cache
+    assert cache.is_pinned("default")
+    # Solo quedan modelos fijados o el recién cargado: se excede el presupuesto sin fallar
+    assert cache.keys() == ["default", "otro"]
+
+
+def test_unpin_applies_the_budget():
+    cache = ModelCache(max_models=1)
+    cache.put("a", {}, pin=True)
+    cache.put("b", {}, pin=True)
+    cache.unpin("a")
+    assert cache.keys() == ["b"]
+    assert not cache.is_pinned("a")
+
+
+def test_byte_budget():
+    cache = ModelCache(max_bytes=100)
+    cache.put("a", {}, size_bytes=60)
+    cache.put("b", {}, size_bytes=30)
+    cache.put("c", {}, size_bytes=30)
+    assert cache.keys() == ["b", "c"]
+    assert cache.total_bytes() == 60
+    assert cache.stats()["evictions"] == 1
+
+
+def test_pop_forgets_size_and_pin():
+    cache = ModelCache(max_bytes=100)
+    cache.put("a", {"model": 1}, size_bytes=80, pin=True)
+    assert cache.pop("a") == {"model": 1}
+    assert cache.total_bytes() == 0
+    assert not cache.is_pinned("a")
+    assert cache.get("a") is None
@@ -0,0 +1,43 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+try:
+    import app.models.ModelLoader  # noqa: F401
+except ImportError:
+    # Sin torch/spaCy instalados: top_k_matrix no usa el loader
+    stub = types.ModuleType("app.models.ModelLoader")
+    stub.crear_corpus_batch = stub.traducir_por_idioma = None
+    sys.modules["app.models.ModelLoader"] = stub
+
+from app.pipeline import top_k_matrix
+
+
+@pytest.mark.parametrize("k", [1, 3, 5])
+def test_top_k_matrix_matches_argsort(k):
+    rng = np.random.default_rng(0)
+    probabilities = rng.random((20, 17)).astype(np.float32)
+    indices, top_probs = top_k_matrix(probabilities, k)
+
+    expected = np.argsort(-probabilities, axis=1)[:, :k]
+    assert indices.shape == (20, k)
+    np.testing.assert_array_equal(indices, expected)
+    np.testing.assert_array_equal(top_probs, np.take_along_axis(probabilities, expected, axis=1))
+    assert top_probs.dtype == np.float32
+
+
+def test_top_k_matrix_with_k_larger_than_classes():
+    probabilities = np.array([[0.2, 0.5, 0.3]], dtype=np.float32)
+    indices, top_probs = top_k_matrix(probabilities, 10)
+    assert indices.tolist() == [[1, 2, 0]]
+    np.testing.assert_allclose(top_probs, [[0.5, 0.3, 0.2]])
+
+
+def test_top_k_matrix_with_k_zero():
+    probabilities = np.ones((4, 3), dtype=np.float32)
+    indices, top_probs = top_k_matrix(probabilities, 0)
+    assert indices.shape == (4, 0)
+    assert indices.dtype == np.int64
+    assert top_probs.dtype == np.float32